@@ -0,0 +1,259 @@
+"""
+Скомпилированная матрица прав доступа.
+
+Все правила AccessRoleRule загружаются одним запросом и сворачиваются в
+словарь {role_id: {element_name: bitmask}}. Проверка права сводится к
+поиску в словаре и побитовым операциям по набору ролей пользователя.
+
+Для токенов с ролями в claims (JWT_EMBED_ROLES) здесь же ведется версия
+ролей каждого пользователя: она увеличивается при изменении его ролей или
+деактивации, и токен с устаревшей версией проверяется по БД.
+
+Матрица перестраивается при смене версии правил. Версия хранится в кеше
+Django и увеличивается сигналами при сохранении/удалении Role,
+BusinessElement и AccessRoleRule (см. api/signals.py). Если воркеров
+несколько, CACHES должен указывать на общий бэкенд; ACCESS_MATRIX_TTL
+в любом случае ограничивает время жизни матрицы в процессе.
+"""
+
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+
+# Биты действий
+READ = 1 << 0
+READ_ALL = 1 << 1
+CREATE = 1 << 2
+UPDATE = 1 << 3
+UPDATE_ALL = 1 << 4
+DELETE = 1 << 5
+DELETE_ALL = 1 << 6
+
+# Соответствие полей AccessRoleRule битам матрицы
+RULE_FIELDS = (
+    ('read_permission', READ),
+    ('read_all_permission', READ_ALL),
+    ('create_permission', CREATE),
+    ('update_permission', UPDATE),
+    ('update_all_permission', UPDATE_ALL),
+    ('delete_permission', DELETE),
+    ('delete_all_permission', DELETE_ALL),
+)
+
+# Названия действий в развернутой матрице прав (read, read_all, ...)
+ACTION_NAMES = tuple((name[:-len('_permission')], bit) for name, bit in RULE_FIELDS)
+
+VERSION_CACHE_KEY = 'access_matrix:version'
+USER_VERSION_CACHE_KEY = 'access_matrix:user:{}'
+
+
+class AccessMatrix:
+    """
+    Матрица роль × бизнес-объект × действие, скомпилированная в битовые маски.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._rules = {}
+        self._role_names = {}
+        self._version = None
+        self._built_at = 0.0
+
+    @property
+    def version(self):
+        """Текущая версия правил (общая для всех процессов при общем кеше)."""
+        version = cache.get(VERSION_CACHE_KEY)
+        if version is None:
+            # Начальное значение уникально для каждого запуска, чтобы версии
+            # не повторялись после перезапуска кеша
+            cache.add(VERSION_CACHE_KEY, time.time_ns(), timeout=None)
+            version = cache.get(VERSION_CACHE_KEY)
+        return version
+
+    def bump_version(self):
+        """Увеличить версию правил и сбросить локальную матрицу."""
+        try:
+            cache.incr(VERSION_CACHE_KEY)
+        except ValueError:
+            cache.set(VERSION_CACHE_KEY, time.time_ns(), timeout=None)
+        with self._lock:
+            self._version = None
+
+    def _is_fresh(self, version) -> bool:
+        ttl = getattr(settings, 'ACCESS_MATRIX_TTL', 60)
+        return self._version == version and time.monotonic() - self._built_at < ttl
+
+    def _get_rules(self) -> dict:
+        version = self.version
+        if self._is_fresh(version):
+            return self._rules
+
+        with self._lock:
+            if not self._is_fresh(version):
+                self._rules, self._role_names = self._build()
+                self._version = version
+                self._built_at = time.monotonic()
+            return self._rules
+
+    def _build(self):
+        """Загрузить правила (одним запросом) и названия ролей, свернуть правила в маски."""
+        from .models import AccessRoleRule, Role
+
+        field_names = [name for name, _ in RULE_FIELDS]
+        rows = AccessRoleRule.objects.values_list('role_id', 'element__name', *field_names)
+
+        rules = {}
+        for role_id, element_name, *flags in rows:
+            mask = 0
+            for flag, (_, bit) in zip(flags, RULE_FIELDS):
+                if flag:
+                    mask |= bit
+            rules.setdefault(str(role_id), {})[element_name] = mask
+
+        role_names = {str(role_id): name for role_id, name in Role.objects.values_list('id', 'name')}
+        return rules, role_names
+
+    def role_names(self, role_ids) -> dict:
+        """Названия ролей {role_id: name} по их ID."""
+        self._get_rules()
+        names = self._role_names
+        return {role_id: names[str(role_id)] for role_id in role_ids if str(role_id) in names}
+
+    def user_version(self, user_id):
+        """Версия набора ролей пользователя."""
+        key = USER_VERSION_CACHE_KEY.format(user_id)
+        version = cache.get(key)
+        if version is None:
+            cache.add(key, time.time_ns(), timeout=None)
+            version = cache.get(key)
+        return version
+
+    def bump_user_version(self, user_id):
+        """Увеличить версию ролей пользователя (токены с ролями станут устаревшими)."""
+        key = USER_VERSION_CACHE_KEY.format(user_id)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, time.time_ns(), timeout=None)
+
+    def bump_user_versions(self, user_ids):
+        """
+        Сменить версии ролей нескольких пользователей одним обращением к кешу.
+
+        Новая версия берется из time_ns и гарантированно отличается от прежней
+        (версии, созданные incr, меньше любого последующего time_ns).
+        """
+        if not user_ids:
+            return
+        version = time.time_ns()
+        cache.set_many(
+            {USER_VERSION_CACHE_KEY.format(user_id): version for user_id in user_ids},
+            timeout=None
+        )
+
+    def mask_for(self, role_ids, element_name: str) -> int:
+        """
+        Объединенная маска прав набора ролей на бизнес-объект.
+
+        Args:
+            role_ids: ID ролей пользователя
+            element_name: название бизнес-объекта
+        """
+        rules = self._get_rules()
+        mask = 0
+        for role_id in role_ids:
+            mask |= rules.get(str(role_id), {}).get(element_name, 0)
+        return mask
+
+    def masks_for(self, role_ids) -> dict:
+        """
+        Объединенные маски прав набора ролей на все бизнес-объекты.
+
+        Args:
+            role_ids: ID ролей пользователя
+
+        Returns:
+            {element_name: bitmask}
+        """
+        rules = self._get_rules()
+        masks = {}
+        for role_id in role_ids:
+            for element_name, mask in rules.get(str(role_id), {}).items():
+                masks[element_name] = masks.get(element_name, 0) | mask
+        return masks
+
+    def permission_matrix(self, role_ids) -> dict:
+        """
+        Развернутая матрица эффективных прав набора ролей.
+
+        Бизнес-объекты, на которые у ролей нет правил, не включаются.
+
+        Returns:
+            {element_name: {'read': bool, 'read_all': bool, ..., 'delete_all': bool}}
+        """
+        return {
+            element_name: {name: bool(mask & bit) for name, bit in ACTION_NAMES}
+            for element_name, mask in sorted(self.masks_for(role_ids).items())
+        }
+
+    def check(self, role_ids, element_name: str, action: str, is_owner: bool = False) -> bool:
+        """
+        Проверить право набора ролей на действие с бизнес-объектом.
+
+        Args:
+            role_ids: ID ролей пользователя
+            element_name: название бизнес-объекта
+            action: действие (read, create, update, delete)
+            is_owner: является ли пользователь владельцем объекта
+
+        Returns:
+            True если хотя бы одна роль дает право, иначе False
+        """
+        return allows(self.mask_for(role_ids, element_name), action, is_owner)
+
+    def check_many(self, role_ids, user_id, checks) -> list:
+        """
+        Проверить несколько прав по одному снимку матрицы.
+
+        Args:
+            role_ids: ID ролей пользователя
+            user_id: ID пользователя (для сравнения с владельцем)
+            checks: список (element_name, action, target_user_id)
+
+        Returns:
+            список bool в порядке checks
+        """
+        masks = self.masks_for(role_ids)
+        return [
+            allows(
+                masks.get(element_name, 0), action,
+                target_user_id is not None and str(target_user_id) == str(user_id)
+            )
+            for element_name, action, target_user_id in checks
+        ]
+
+
+def allows(mask: int, action: str, is_owner: bool = False) -> bool:
+    """
+    Разрешает ли маска действие.
+
+    Args:
+        mask: объединенная маска прав на бизнес-объект
+        action: действие (read, create, update, delete)
+        is_owner: является ли пользователь владельцем объекта
+    """
+    if action == 'read':
+        return bool(mask & (READ | READ_ALL))
+    if action == 'create':
+        return bool(mask & CREATE)
+    if action == 'update':
+        return bool(mask & UPDATE_ALL) or (is_owner and bool(mask & UPDATE))
+    if action == 'delete':
+        return bool(mask & DELETE_ALL) or (is_owner and bool(mask & DELETE))
+    return False
+
+
+access_matrix = AccessMatrix()
@@ -0,0 +1,159 @@
+"""
+Отслеживание последней активности сессий с отложенной записью.
+
+Вместо UPDATE на каждый запрос время активности накапливается в памяти и
+записывается пачками одним UPDATE ... CASE по истечении интервала или при
+наполнении буфера. Активность сессии не записывается чаще, чем раз в
+SESSION_ACTIVITY_MIN_AGE секунд.
+
+Буфер записывается и без новых запросов: при первой отметке активности
+запускается фоновый поток, который сбрасывает его каждые
+SESSION_ACTIVITY_FLUSH_INTERVAL секунд.
+
+Настройки:
+- SESSION_ACTIVITY_FLUSH_INTERVAL: максимальный интервал между записями (секунды)
+- SESSION_ACTIVITY_FLUSH_SIZE: размер буфера, при котором запись выполняется сразу
+- SESSION_ACTIVITY_MIN_AGE: минимальный возраст last_activity для обновления (секунды)
+"""
+
+import atexit
+import logging
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import DatabaseError, close_old_connections
+from django.db.models import Case, F, Value, When
+from django.utils import timezone
+
+
+logger = logging.getLogger(__name__)
+
+FLUSH_BATCH_SIZE = 500
+
+
+class ActivityTracker:
+    """
+    Буфер {session_key: время активности} с пакетной записью в таблицу sessions.
+    """
+
+    def __init__(self, flush_interval=None, flush_size=None, min_age=None):
+        self._flush_interval = flush_interval
+        self._flush_size = flush_size
+        self._min_age = min_age
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._last_flush = time.monotonic()
+        self._flusher = None
+
+    @property
+    def flush_interval(self) -> float:
+        if self._flush_interval is None:
+            return getattr(settings, 'SESSION_ACTIVITY_FLUSH_INTERVAL', 30)
+        return self._flush_interval
+
+    @property
+    def flush_size(self) -> int:
+        if self._flush_size is None:
+            return getattr(settings, 'SESSION_ACTIVITY_FLUSH_SIZE', 500)
+        return self._flush_size
+
+    @property
+    def min_age(self) -> timedelta:
+        if self._min_age is None:
+            return timedelta(seconds=getattr(settings, 'SESSION_ACTIVITY_MIN_AGE', 60))
+        return timedelta(seconds=self._min_age)
+
+    def is_stale(self, last_activity, now=None) -> bool:
+        """Пора ли обновлять активность с таким last_activity."""
+        now = now or timezone.now()
+        return last_activity is None or now - last_activity >= self.min_age
+
+    def touch(self, session_key: str, last_activity=None):
+        """
+        Отметить активность сессии.
+
+        Args:
+            session_key: ключ сессии
+            last_activity: известное текущее значение last_activity
+        """
+        now = timezone.now()
+        if not self.is_stale(last_activity, now):
+            return
+
+        with self._lock:
+            self._pending[session_key] = now
+            due = (
+                len(self._pending) >= self.flush_size
+                or time.monotonic() - self._last_flush >= self.flush_interval
+            )
+            # Поток не переживает fork, поэтому проверяется, что он жив
+            if self._flusher is None or not self._flusher.is_alive():
+                self._flusher = ActivityFlusher(self)
+                self._flusher.start()
+
+        if due:
+            self.flush()
+
+    def flush(self) -> int:
+        """
+        Записать накопленную активность в БД.
+
+        Returns:
+            количество обновленных строк
+        """
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._last_flush = time.monotonic()
+
+        if not pending:
+            return 0
+
+        from .models import Session
+
+        updated = 0
+        items = list(pending.items())
+        try:
+            for start in range(0, len(items), FLUSH_BATCH_SIZE):
+                batch = items[start:start + FLUSH_BATCH_SIZE]
+                # Более новое значение, записанное другим воркером, не перезаписывается
+                last_activity = Case(
+                    *[
+                        When(session_key=key, last_activity__lt=seen, then=Value(seen))
+                        for key, seen in batch
+                    ],
+                    default=F('last_activity')
+                )
+                updated += Session.objects.filter(
+                    session_key__in=[key for key, _ in batch]
+                ).update(last_activity=last_activity)
+        except DatabaseError:
+            logger.exception('Не удалось записать активность %d сессий', len(items))
+        return updated
+
+
+class ActivityFlusher(threading.Thread):
+    """
+    Фоновый поток, записывающий буфер активности по интервалу,
+    даже если новых запросов в процессе нет.
+    """
+
+    def __init__(self, tracker: ActivityTracker):
+        super().__init__(name='session-activity-flusher', daemon=True)
+        self.tracker = tracker
+        self._stopped = threading.Event()
+
+    def run(self):
+        while not self._stopped.wait(self.tracker.flush_interval):
+            try:
+                self.tracker.flush()
+            finally:
+                close_old_connections()
+
+    def stop(self):
+        self._stopped.set()
+
+
+activity_tracker = ActivityTracker()
+atexit.register(activity_tracker.flush)
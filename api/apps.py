@@ -1,4 +1,3 @@
-
 from django.apps import AppConfig
 
 
@@ -6,3 +5,6 @@ class ApiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'api'
     verbose_name = 'Authentication & Authorization API'
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -4,11 +4,82 @@
 
 import jwt
 import json
+import uuid
 from datetime import datetime, timedelta
 from django.conf import settings
-from rest_framework.authentication import BaseAuthentication
-from rest_framework.exceptions import AuthenticationFailed
-from .models import User, Session
+from django.utils.functional import SimpleLazyObject
+from rest_framework.authentication import BaseAuthentication, CSRFCheck
+from rest_framework.exceptions import AuthenticationFailed, PermissionDenied
+from .access_matrix import access_matrix
+from .models import User, UserRole, Session
+from .session_store import get_session_store
+from .token_cache import token_cache
+from .metrics import (
+    jwt_authentications, jwt_decode_duration, session_lookups, session_lookup_duration, permission_checks,
+    record_permission_checks,
+)
+
+
+class TokenUser(SimpleLazyObject):
+    """
+    Пользователь, восстановленный из claims JWT без обращения к БД.
+
+    ID, роли и проверки прав доступны сразу. Обращение к любому другому
+    атрибуту загружает User из БД (один раз за запрос).
+    """
+
+    def __init__(self, user_id: str, role_ids):
+        super().__init__(lambda: User.objects.get(id=user_id, is_active=True))
+        self.__dict__['_user_id'] = uuid.UUID(str(user_id))
+        self.__dict__['_role_ids'] = [str(role_id) for role_id in role_ids]
+
+    def __bool__(self):
+        return True
+
+    @property
+    def id(self):
+        return self._user_id
+
+    @property
+    def pk(self):
+        return self._user_id
+
+    @property
+    def is_active(self) -> bool:
+        # Деактивация увеличивает версию ролей, такие токены сюда не попадают
+        return True
+
+    @property
+    def is_authenticated(self) -> bool:
+        return True
+
+    def get_role_snapshot(self) -> dict:
+        """Роли пользователя {role_id: role_name} из claims токена."""
+        return access_matrix.role_names(self._role_ids)
+
+    @property
+    def role_ids(self) -> list:
+        return list(self._role_ids)
+
+    def has_role(self, *role_names: str) -> bool:
+        return any(name in role_names for name in self.get_role_snapshot().values())
+
+    def has_permission(self, element_name: str, action: str, target_user_id=None) -> bool:
+        """То же, что User.has_permission, но по ролям из токена."""
+        is_owner = target_user_id is not None and str(target_user_id) == str(self._user_id)
+        allowed = access_matrix.check(self._role_ids, element_name, action, is_owner)
+        permission_checks.inc(action=action, result='allowed' if allowed else 'denied')
+        return allowed
+
+    def get_permission_matrix(self) -> dict:
+        """То же, что User.get_permission_matrix, но по ролям из токена."""
+        return access_matrix.permission_matrix(self._role_ids)
+
+    def check_permissions(self, checks) -> list:
+        """То же, что User.check_permissions, но по ролям из токена."""
+        results = access_matrix.check_many(self._role_ids, self._user_id, checks)
+        record_permission_checks(checks, results)
+        return results
 
 
 class JWTAuthentication(BaseAuthentication):
@@ -28,22 +99,37 @@ class JWTAuthentication(BaseAuthentication):
 
         token = auth_header[7:]  # Удалить 'Bearer '
 
-        try:
-            payload = jwt.decode(
-                token,
-                settings.JWT_SECRET,
-                algorithms=[settings.JWT_ALGORITHM]
-            )
-        except jwt.ExpiredSignatureError:
-            raise AuthenticationFailed('Токен истек')
-        except jwt.InvalidTokenError:
-            raise AuthenticationFailed('Неверный токен')
+        # Проверенные ранее токены берутся из кеша без повторного jwt.decode
+        payload = token_cache.get(token)
+        if payload is None:
+            try:
+                with jwt_decode_duration.time():
+                    payload = jwt.decode(
+                        token,
+                        settings.JWT_SECRET,
+                        algorithms=[settings.JWT_ALGORITHM]
+                    )
+            except jwt.ExpiredSignatureError:
+                jwt_authentications.inc(result='expired')
+                raise AuthenticationFailed('Токен истек')
+            except jwt.InvalidTokenError:
+                jwt_authentications.inc(result='invalid')
+                raise AuthenticationFailed('Неверный токен')
+            token_cache.put(token, payload)
+
+        # Токен с ролями и актуальной версией не требует загрузки пользователя
+        if getattr(settings, 'JWT_EMBED_ROLES', False) and 'roles' in payload:
+            if payload.get('pv') == access_matrix.user_version(payload['user_id']):
+                jwt_authentications.inc(result='success')
+                return (TokenUser(payload['user_id'], payload['roles']), token)
 
         try:
             user = User.objects.get(id=payload['user_id'], is_active=True)
         except User.DoesNotExist:
+            jwt_authentications.inc(result='user_not_found')
             raise AuthenticationFailed('Пользователь не найден')
 
+        jwt_authentications.inc(result='success')
         return (user, token)
 
 
@@ -62,25 +148,117 @@ class SessionAuthentication(BaseAuthentication):
         if not session_id:
             return None
 
-        try:
-            session = Session.objects.get(session_key=session_id)
-        except Session.DoesNotExist:
+        store = get_session_store()
+        with session_lookup_duration.time():
+            session = store.get(session_id)
+        if session is None:
+            session_lookups.inc(result='not_found')
             raise AuthenticationFailed('Сессия не найдена')
 
         if not session.is_valid():
-            session.delete()
+            store.delete(session_id)
+            session_lookups.inc(result='expired')
             raise AuthenticationFailed('Сессия истекла')
 
-        user = session.user
+        try:
+            user = session.user
+        except User.DoesNotExist:
+            # Хранилища вне БД не знают об удалении пользователя
+            store.delete(session_id)
+            session_lookups.inc(result='user_not_found')
+            raise AuthenticationFailed('Пользователь не найден')
+
         if not user.is_active:
+            session_lookups.inc(result='inactive')
             raise AuthenticationFailed('Пользователь неактивен')
 
+        session_lookups.inc(result='success')
+        store.touch(session)
         return (user, session_id)
 
 
+class MiddlewareAuthentication(BaseAuthentication):
+    """
+    Аутентификация DRF, повторно использующая результат AuthenticationMiddleware.
+    Токен проверяется и пользователь загружается один раз на запрос.
+    """
+
+    def authenticate(self, request):
+        """
+        Вернуть пользователя, определенного для исходного Django-запроса.
+        Если пользователь определен по cookie сессии, небезопасные методы
+        требуют CSRF-токен (как в rest_framework.authentication.SessionAuthentication).
+        """
+        auth_result = authenticate_request(request._request)
+        if auth_result and getattr(request._request, '_auth_via_session', False):
+            self.enforce_csrf(request)
+        return auth_result
+
+    def enforce_csrf(self, request):
+        """
+        Проверить CSRF для запроса, аутентифицированного cookie сессии.
+
+        Raises:
+            PermissionDenied: если проверка CSRF не пройдена
+        """
+        def dummy_get_response(request):  # pragma: no cover
+            return None
+
+        check = CSRFCheck(dummy_get_response)
+        # process_request заполняет request.META['CSRF_COOKIE'] для process_view
+        check.process_request(request)
+        reason = check.process_view(request, None, (), {})
+        if reason:
+            raise PermissionDenied(f'CSRF Failed: {reason}')
+
+
+def authenticate_request(request):
+    """
+    Аутентифицировать Django-запрос: через JWT, затем через сессию.
+    Результат кешируется на объекте запроса, повторные вызовы бесплатны.
+
+    Args:
+        request: объект HttpRequest
+
+    Returns:
+        (user, auth) или None, если запрос анонимный
+
+    Raises:
+        AuthenticationFailed: если передан неверный JWT и сессия не подошла
+    """
+    if not hasattr(request, '_auth_result'):
+        auth_result, auth_error = None, None
+
+        try:
+            auth_result = JWTAuthentication().authenticate(request)
+        except AuthenticationFailed as exc:
+            auth_error = exc
+
+        if not auth_result:
+            try:
+                auth_result = SessionAuthentication().authenticate(request)
+            except AuthenticationFailed:
+                # Недействительная cookie не мешает анонимному доступу
+                pass
+            request._auth_via_session = auth_result is not None
+
+        if auth_result:
+            auth_error = None
+
+        request._auth_result = auth_result
+        request._auth_error = auth_error
+
+    if request._auth_error:
+        raise request._auth_error
+    return request._auth_result
+
+
 def generate_jwt_token(user_id: str) -> str:
     """
     Генерировать JWT токен для пользователя.
+
+    При JWT_EMBED_ROLES в claims добавляются ID ролей (roles) и версия
+    ролей пользователя (pv), чтобы проверять права без обращения к БД.
     
     Args:
         user_id: ID пользователя
@@ -93,6 +271,13 @@ def generate_jwt_token(user_id: str) -> str:
         'iat': datetime.utcnow(),
         'exp': datetime.utcnow() + timedelta(hours=settings.JWT_EXPIRATION_HOURS)
     }
+
+    if getattr(settings, 'JWT_EMBED_ROLES', False):
+        # Версия читается до ролей: изменение ролей между чтениями сделает токен устаревшим
+        payload['pv'] = access_matrix.user_version(user_id)
+        payload['roles'] = [
+            str(role_id) for role_id in UserRole.objects.filter(user_id=user_id).values_list('role_id', flat=True)
+        ]
     token = jwt.encode(
         payload,
         settings.JWT_SECRET,
@@ -103,7 +288,7 @@ def generate_jwt_token(user_id: str) -> str:
 
 def create_session(user: User, ip_address: str, user_agent: str = '') -> Session:
     """
-    Создать новую сессию для пользователя.
+    Создать новую сессию для пользователя в хранилище сессий.
     
     Args:
         user: объект пользователя
@@ -113,18 +298,7 @@ def create_session(user: User, ip_address: str, user_agent: str = '') -> Session
     Returns:
         объект Session
     """
-    import uuid
-    session_key = str(uuid.uuid4())
-    expires_at = timezone.now() + timedelta(hours=24)
-    
-    session = Session.objects.create(
-        user=user,
-        session_key=session_key,
-        ip_address=ip_address,
-        user_agent=user_agent,
-        expires_at=expires_at
-    )
-    return session
+    return get_session_store().create(user, ip_address, user_agent)
 
 
 def invalidate_session(session_id: str) -> bool:
@@ -137,12 +311,4 @@ def invalidate_session(session_id: str) -> bool:
     Returns:
         True если сессия удалена, иначе False
     """
-    try:
-        session = Session.objects.get(session_key=session_id)
-        session.delete()
-        return True
-    except Session.DoesNotExist:
-        return False
-
-
-from django.utils import timezone
+    return get_session_store().delete(session_id)
@@ -1,9 +1,14 @@
 
+from django.conf import settings
 from rest_framework import viewsets, status
 from rest_framework.response import Response
 from rest_framework.decorators import action
-from rest_framework.serializers import Serializer, CharField, IntegerField, ListSerializer
+from rest_framework.exceptions import ValidationError
+from rest_framework.serializers import Serializer, CharField, IntegerField, ListField, ListSerializer
 from .permissions import HasAccessToElement
+from .repositories import InMemoryRepository
+from .pagination import ProductPagination, OrderPagination
+from .scoping import RowScope
 
 
 # Mock-данные для демонстрации
@@ -23,22 +28,48 @@ MOCK_REPORTS = [
     {'id': 2, 'title': 'Отчет по заказам', 'date': '2024-01-02', 'owner_id': '2'},
 ]
 
+# Репозитории с mock-данными
+product_repository = InMemoryRepository(MOCK_PRODUCTS, sorted_fields=('price', 'name'))
+order_repository = InMemoryRepository(
+    MOCK_ORDERS, hash_fields=('owner_id', 'product_id'), sorted_fields=('quantity', 'total')
+)
+report_repository = InMemoryRepository(MOCK_REPORTS)
+
+
+def _parse_pk(pk):
+    """ID записи из URL или None, если он не число."""
+    try:
+        return int(pk)
+    except (TypeError, ValueError):
+        return None
+
+
+def _int_param(request, name: str):
+    """Целочисленный параметр запроса или None."""
+    value = request.query_params.get(name)
+    if value is None or value == '':
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        raise ValidationError({name: 'Ожидается целое число'})
+
 
 class ProductSerializer(Serializer):
     """Сериализатор для Product."""
-    id = IntegerField()
+    id = IntegerField(read_only=True)
     name = CharField(max_length=200)
     price = IntegerField()
-    owner_id = CharField()
+    owner_id = CharField(read_only=True)
 
 
 class OrderSerializer(Serializer):
     """Сериализатор для Order."""
-    id = IntegerField()
+    id = IntegerField(read_only=True)
     product_id = IntegerField()
     quantity = IntegerField()
     total = IntegerField()
-    owner_id = CharField()
+    owner_id = CharField(read_only=True)
 
 
 class ReportSerializer(Serializer):
@@ -49,23 +80,203 @@ class ReportSerializer(Serializer):
     owner_id = CharField()
 
 
-class ProductViewSet(viewsets.ViewSet):
+class BulkListSerializer(ListSerializer):
+    """
+    Список, элементы которого проверяются независимо.
+
+    Ошибка в элементе не отклоняет пачку: validated_data содержит None на месте
+    невалидного элемента, а item_errors — ошибки в том же порядке.
+    Пачка целиком отклоняется, только если это не список или он пуст/слишком длинный.
+    """
+
+    def to_internal_value(self, data):
+        if not isinstance(data, list):
+            raise ValidationError({'items': ['Ожидается список']})
+        if not data:
+            raise ValidationError({'items': ['Список не может быть пустым']})
+        if self.max_length is not None and len(data) > self.max_length:
+            raise ValidationError({'items': [f'Не более {self.max_length} элементов']})
+
+        validated, self.item_errors = [], []
+        for item in data:
+            try:
+                validated.append(self.child.run_validation(item))
+                self.item_errors.append(None)
+            except ValidationError as exc:
+                validated.append(None)
+                self.item_errors.append(exc.detail)
+        return validated
+
+
+def _bulk_response(results):
+    summary = {}
+    for result in results:
+        summary[result['status']] = summary.get(result['status'], 0) + 1
+    return Response({'results': results, 'summary': summary}, status=status.HTTP_200_OK)
+
+
+class BulkActionsMixin:
+    """
+    Массовые операции для ViewSet над репозиторием.
+
+    Права на объект загружаются один раз на пачку (RowScope), проверка
+    own/all для каждого элемента выполняется в памяти. Элементы обрабатываются
+    независимо: ответ содержит статус каждого элемента.
+
+    ViewSet задает element_name, repository и serializer_class.
+    """
+    element_name = None
+    repository = None
+    serializer_class = None
+
+    def _bulk_max_items(self) -> int:
+        return getattr(settings, 'BUSINESS_BULK_MAX_ITEMS', 50000)
+
+    def _validate_items(self, request, partial: bool = False):
+        """
+        Проверить пачку из тела запроса: [...] или {"items": [...]}.
+
+        Returns:
+            (исходные элементы, проверенные данные или None, ошибки или None)
+        """
+        items = request.data.get('items') if isinstance(request.data, dict) else request.data
+        serializer = BulkListSerializer(
+            child=self.serializer_class(), data=items, partial=partial, max_length=self._bulk_max_items()
+        )
+        serializer.is_valid(raise_exception=True)
+        return items, serializer.validated_data, serializer.item_errors
+
+    @action(detail=False, methods=['post'])
+    def bulk_create(self, request):
+        """
+        Массовое создание.
+        POST /api/{products|orders}/bulk_create/
+        Body: {"items": [{...}, ...]}
+        """
+        scope = RowScope.for_user(request.user, self.element_name)
+        if not scope.can('create'):
+            return Response(
+                {'error': 'Доступ запрещен'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+
+        _, validated, errors = self._validate_items(request)
+        created = iter(self.repository.bulk_create([
+            dict(data, owner_id=scope.user_id) for data in validated if data is not None
+        ]))
+
+        results = []
+        for index, (data, error) in enumerate(zip(validated, errors)):
+            if data is None:
+                results.append({'index': index, 'status': 'invalid', 'errors': error})
+            else:
+                results.append({'index': index, 'status': 'created', 'id': next(created)['id']})
+        return _bulk_response(results)
+
+    @action(detail=False, methods=['post'])
+    def bulk_update(self, request):
+        """
+        Массовое частичное обновление.
+        POST /api/{products|orders}/bulk_update/
+        Body: {"items": [{"id": 1, ...}, ...]}
+        """
+        scope = RowScope.for_user(request.user, self.element_name)
+        # Без права update хотя бы на свои записи пачку нет смысла разбирать
+        if not scope.can('update', scope.user_id):
+            return Response(
+                {'error': 'Доступ запрещен'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+
+        items, validated, errors = self._validate_items(request, partial=True)
+        pks = [_parse_pk(item.get('id')) if isinstance(item, dict) else None for item in items]
+        existing = self.repository.get_many({pk for pk in pks if pk is not None})
+
+        results, changes = [], {}
+        for index, (pk, data, error) in enumerate(zip(pks, validated, errors)):
+            result = {'index': index, 'id': pk}
+            if pk is None:
+                result.update(status='invalid', errors={'id': ['Ожидается целое число']})
+            elif data is None:
+                result.update(status='invalid', errors=error)
+            elif pk not in existing:
+                result['status'] = 'not_found'
+            elif not scope.can('update', existing[pk]['owner_id']):
+                result['status'] = 'forbidden'
+            else:
+                result['status'] = 'updated'
+                changes.setdefault(pk, {}).update(data)
+            results.append(result)
+
+        updated = self.repository.bulk_update(changes)
+        for result in results:
+            # Запись удалена между чтением и обновлением
+            if result['status'] == 'updated' and result['id'] not in updated:
+                result['status'] = 'not_found'
+        return _bulk_response(results)
+
+    @action(detail=False, methods=['post'])
+    def bulk_delete(self, request):
+        """
+        Массовое удаление.
+        POST /api/{products|orders}/bulk_delete/
+        Body: {"ids": [1, 2, ...]}
+        """
+        scope = RowScope.for_user(request.user, self.element_name)
+        if not scope.can('delete', scope.user_id):
+            return Response(
+                {'error': 'Доступ запрещен'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+
+        field = ListField(child=IntegerField(), allow_empty=False, max_length=self._bulk_max_items())
+        try:
+            pks = field.run_validation(request.data.get('ids') if isinstance(request.data, dict) else None)
+        except ValidationError as exc:
+            raise ValidationError({'ids': exc.detail})
+        existing = self.repository.get_many(set(pks))
+
+        results, allowed = [], []
+        for index, pk in enumerate(pks):
+            result = {'index': index, 'id': pk}
+            if pk not in existing:
+                result['status'] = 'not_found'
+            elif not scope.can('delete', existing[pk]['owner_id']):
+                result['status'] = 'forbidden'
+            else:
+                result['status'] = 'deleted'
+                allowed.append(pk)
+            results.append(result)
+
+        deleted = self.repository.bulk_delete(allowed)
+        for result in results:
+            if result['status'] == 'deleted' and result['id'] not in deleted:
+                result['status'] = 'not_found'
+        return _bulk_response(results)
+
+
+class ProductViewSet(BulkActionsMixin, viewsets.ViewSet):
     """
     Mock ViewSet для товаров.
     Демонстрирует применение системы авторизации.
     """
     element_name = 'products'
+    repository = product_repository
+    serializer_class = ProductSerializer
 
     def list(self, request):
         """
         Получить список товаров.
-        GET /api/products/
-        
+        GET /api/products/?min_price=100&max_price=5000&name=Ноут&owner_id=1
+            &ordering=-price&page_size=20&cursor=...
+
+        Фильтры: min_price, max_price, name (префикс без учета регистра), owner_id.
+        Сортировка: id, price, name (с "-" — по убыванию). Курсорная пагинация.
+
         Правила доступа:
-        - Admin: может видеть все товары
-        - Manager: может видеть все товары
-        - User: может видеть только свои товары
-        - Guest: не может видеть товары
+        - read_all (Admin, Manager): все товары
+        - read (User, Guest): только свои товары
+        - без права на чтение: 403
         """
         if not request.user:
             return Response(
@@ -74,23 +285,31 @@ class ProductViewSet(viewsets.ViewSet):
             )
 
         # Проверить право на чтение
-        if not request.user.has_permission('products', 'read'):
+        scope = RowScope.for_user(request.user, 'products')
+        if not scope.can_read:
             return Response(
                 {'error': 'Доступ запрещен'},
                 status=status.HTTP_403_FORBIDDEN
             )
 
-        # Если пользователь может читать все товары
-        if request.user.has_permission('products', 'read') and \
-           request.user.roles.filter(name__in=['Admin', 'Manager']).exists():
-            products = MOCK_PRODUCTS
-        else:
-            # Иначе показать только свои товары
-            user_id = str(request.user.id)
-            products = [p for p in MOCK_PRODUCTS if p['owner_id'] == user_id]
-
+        filters = {}
+        min_price = _int_param(request, 'min_price')
+        if min_price is not None:
+            filters['price__gte'] = min_price
+        max_price = _int_param(request, 'max_price')
+        if max_price is not None:
+            filters['price__lte'] = max_price
+        name = request.query_params.get('name')
+        if name:
+            filters['name__startswith'] = name
+
+        # С правом read_all видны все товары, с правом read — только свои
+        filters = scope.repository_filters(filters, request.query_params.get('owner_id'))
+
+        paginator = ProductPagination()
+        products = paginator.paginate_repository(product_repository, request, filters)
         serializer = ProductSerializer(products, many=True)
-        return Response(serializer.data)
+        return paginator.get_paginated_response(serializer.data)
 
     def retrieve(self, request, pk=None):
         """
@@ -103,24 +322,22 @@ class ProductViewSet(viewsets.ViewSet):
                 status=status.HTTP_401_UNAUTHORIZED
             )
 
-        if not request.user.has_permission('products', 'read'):
+        scope = RowScope.for_user(request.user, 'products')
+        if not scope.can_read:
             return Response(
                 {'error': 'Доступ запрещен'},
                 status=status.HTTP_403_FORBIDDEN
             )
 
-        try:
-            product = next(p for p in MOCK_PRODUCTS if p['id'] == int(pk))
-        except StopIteration:
+        product = product_repository.get(_parse_pk(pk))
+        if product is None:
             return Response(
                 {'error': 'Товар не найден'},
                 status=status.HTTP_404_NOT_FOUND
             )
 
         # Проверить, может ли пользователь видеть этот товар
-        user_id = str(request.user.id)
-        if product['owner_id'] != user_id and \
-           not request.user.roles.filter(name__in=['Admin', 'Manager']).exists():
+        if not scope.allows(product['owner_id']):
             return Response(
                 {'error': 'Доступ запрещен'},
                 status=status.HTTP_403_FORBIDDEN
@@ -148,11 +365,10 @@ class ProductViewSet(viewsets.ViewSet):
 
         serializer = ProductSerializer(data=request.data)
         if serializer.is_valid():
-            product = serializer.validated_data
-            product['owner_id'] = str(request.user.id)
-            product['id'] = max([p['id'] for p in MOCK_PRODUCTS]) + 1
-            MOCK_PRODUCTS.append(product)
-            return Response(serializer.data, status=status.HTTP_201_CREATED)
+            product = product_repository.create(
+                dict(serializer.validated_data, owner_id=str(request.user.id))
+            )
+            return Response(ProductSerializer(product).data, status=status.HTTP_201_CREATED)
 
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
@@ -167,9 +383,8 @@ class ProductViewSet(viewsets.ViewSet):
                 status=status.HTTP_401_UNAUTHORIZED
             )
 
-        try:
-            product = next(p for p in MOCK_PRODUCTS if p['id'] == int(pk))
-        except StopIteration:
+        product = product_repository.get(_parse_pk(pk))
+        if product is None:
             return Response(
                 {'error': 'Товар не найден'},
                 status=status.HTTP_404_NOT_FOUND
@@ -192,8 +407,13 @@ class ProductViewSet(viewsets.ViewSet):
 
         serializer = ProductSerializer(data=request.data)
         if serializer.is_valid():
-            product.update(serializer.validated_data)
-            return Response(serializer.data)
+            product = product_repository.update(product['id'], serializer.validated_data)
+            if product is None:
+                return Response(
+                    {'error': 'Товар не найден'},
+                    status=status.HTTP_404_NOT_FOUND
+                )
+            return Response(ProductSerializer(product).data)
 
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
@@ -208,9 +428,8 @@ class ProductViewSet(viewsets.ViewSet):
                 status=status.HTTP_401_UNAUTHORIZED
             )
 
-        try:
-            product = next(p for p in MOCK_PRODUCTS if p['id'] == int(pk))
-        except StopIteration:
+        product = product_repository.get(_parse_pk(pk))
+        if product is None:
             return Response(
                 {'error': 'Товар не найден'},
                 status=status.HTTP_404_NOT_FOUND
@@ -231,38 +450,57 @@ class ProductViewSet(viewsets.ViewSet):
                     status=status.HTTP_403_FORBIDDEN
                 )
 
-        MOCK_PRODUCTS.remove(product)
+        product_repository.delete(product['id'])
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
-class OrderViewSet(viewsets.ViewSet):
+class OrderViewSet(BulkActionsMixin, viewsets.ViewSet):
     """
     Mock ViewSet для заказов.
     """
     element_name = 'orders'
+    repository = order_repository
+    serializer_class = OrderSerializer
 
     def list(self, request):
-        """Получить список заказов."""
+        """
+        Получить список заказов.
+        GET /api/orders/?product_id=1&min_total=1000&max_total=50000&owner_id=1
+            &ordering=-total&page_size=20&cursor=...
+
+        Фильтры: product_id, min_total, max_total, owner_id.
+        Сортировка: id, quantity, total (с "-" — по убыванию). Курсорная пагинация.
+        """
         if not request.user:
             return Response(
                 {'error': 'Пользователь не аутентифицирован'},
                 status=status.HTTP_401_UNAUTHORIZED
             )
 
-        if not request.user.has_permission('orders', 'read'):
+        scope = RowScope.for_user(request.user, 'orders')
+        if not scope.can_read:
             return Response(
                 {'error': 'Доступ запрещен'},
                 status=status.HTTP_403_FORBIDDEN
             )
 
-        user_id = str(request.user.id)
-        if request.user.roles.filter(name__in=['Admin', 'Manager']).exists():
-            orders = MOCK_ORDERS
-        else:
-            orders = [o for o in MOCK_ORDERS if o['owner_id'] == user_id]
-
+        filters = {}
+        product_id = _int_param(request, 'product_id')
+        if product_id is not None:
+            filters['product_id'] = product_id
+        min_total = _int_param(request, 'min_total')
+        if min_total is not None:
+            filters['total__gte'] = min_total
+        max_total = _int_param(request, 'max_total')
+        if max_total is not None:
+            filters['total__lte'] = max_total
+
+        filters = scope.repository_filters(filters, request.query_params.get('owner_id'))
+
+        paginator = OrderPagination()
+        orders = paginator.paginate_repository(order_repository, request, filters)
         serializer = OrderSerializer(orders, many=True)
-        return Response(serializer.data)
+        return paginator.get_paginated_response(serializer.data)
 
     def retrieve(self, request, pk=None):
         """Получить информацию о заказе."""
@@ -272,23 +510,21 @@ class OrderViewSet(viewsets.ViewSet):
                 status=status.HTTP_401_UNAUTHORIZED
             )
 
-        if not request.user.has_permission('orders', 'read'):
+        scope = RowScope.for_user(request.user, 'orders')
+        if not scope.can_read:
             return Response(
                 {'error': 'Доступ запрещен'},
                 status=status.HTTP_403_FORBIDDEN
             )
 
-        try:
-            order = next(o for o in MOCK_ORDERS if o['id'] == int(pk))
-        except StopIteration:
+        order = order_repository.get(_parse_pk(pk))
+        if order is None:
             return Response(
                 {'error': 'Заказ не найден'},
                 status=status.HTTP_404_NOT_FOUND
             )
 
-        user_id = str(request.user.id)
-        if order['owner_id'] != user_id and \
-           not request.user.roles.filter(name__in=['Admin', 'Manager']).exists():
+        if not scope.allows(order['owner_id']):
             return Response(
                 {'error': 'Доступ запрещен'},
                 status=status.HTTP_403_FORBIDDEN
@@ -312,18 +548,14 @@ class ReportViewSet(viewsets.ViewSet):
                 status=status.HTTP_401_UNAUTHORIZED
             )
 
-        if not request.user.has_permission('reports', 'read'):
-            return Response(
-                {'error': 'Доступ запрещен'},
-                status=status.HTTP_403_FORBIDDEN
-            )
-
-        # Только Admin и Manager могут видеть отчеты
-        if not request.user.roles.filter(name__in=['Admin', 'Manager']).exists():
+        # С правом read_all видны все отчеты, с правом read — только свои
+        scope = RowScope.for_user(request.user, 'reports')
+        if not scope.can_read:
             return Response(
                 {'error': 'Доступ запрещен'},
                 status=status.HTTP_403_FORBIDDEN
             )
 
-        serializer = ReportSerializer(MOCK_REPORTS, many=True)
+        reports, _ = report_repository.query(scope.repository_filters())
+        serializer = ReportSerializer(reports, many=True)
         return Response(serializer.data)
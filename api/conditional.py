@@ -0,0 +1,109 @@
+"""
+Условные GET-запросы (ETag / If-None-Match).
+
+ETag вычисляется из дешевых маркеров версии (ID, даты изменения, агрегаты
+таблиц) до загрузки и сериализации данных; при совпадении клиенту
+возвращается 304 без тела.
+
+Маркеры берутся из БД, а не из CACHES: при локальном для процесса кеше
+изменение, обработанное другим воркером, иначе не меняло бы ETag.
+"""
+
+import hashlib
+
+from django.db.models import Count, Max, Value
+from django.utils.cache import get_conditional_response
+from django.utils.http import quote_etag
+from django.views.decorators.http import condition
+
+from .models import Role, BusinessElement, AccessRoleRule
+
+
+def make_etag(*parts) -> str:
+    """
+    ETag из маркеров версии.
+
+    Args:
+        parts: значения, от которых зависит ответ
+
+    Returns:
+        ETag в кавычках
+    """
+    digest = hashlib.md5('|'.join(str(part) for part in parts).encode(), usedforsecurity=False)
+    return quote_etag(digest.hexdigest())
+
+
+def not_modified(request, etag: str = None, last_modified=None):
+    """
+    Ответ 304 (или 412), если заголовки запроса совпадают с текущей версией.
+
+    Args:
+        request: запрос DRF или Django
+        etag: текущий ETag
+        last_modified: время последнего изменения (timestamp)
+
+    Returns:
+        HttpResponse или None, если ответ нужно построить
+    """
+    response = get_conditional_response(
+        getattr(request, '_request', request), etag=etag, last_modified=last_modified
+    )
+    if response is not None and etag:
+        response['ETag'] = etag
+    return response
+
+
+def rbac_state(request=None) -> tuple:
+    """
+    Маркер версии ролей, бизнес-объектов и правил доступа: (max(updated_at), count)
+    по каждой таблице, одним запросом. Изменение или создание строки меняет
+    max(updated_at), удаление — count.
+
+    Args:
+        request: запрос, на котором кешируется результат (etag и last_modified
+            вычисляются для одного запроса)
+
+    Returns:
+        (маркер для ETag, время последнего изменения или None)
+    """
+    state = getattr(request, '_rbac_state', None)
+    if state is not None:
+        return state
+
+    querysets = [
+        model.objects.order_by().values(table=Value(model._meta.db_table)).annotate(
+            changed=Max('updated_at'), total=Count('pk')
+        )
+        for model in (Role, BusinessElement, AccessRoleRule)
+    ]
+    rows = sorted(querysets[0].union(*querysets[1:], all=True), key=lambda row: row['table'])
+    changed = [row['changed'] for row in rows if row['changed'] is not None]
+    state = (
+        '|'.join(f'{row["table"]}:{row["changed"].isoformat() if row["changed"] else ""}:{row["total"]}' for row in rows),
+        max(changed) if changed else None,
+    )
+    if request is not None:
+        request._rbac_state = state
+    return state
+
+
+def rbac_etag(request, *args, **kwargs) -> str:
+    """
+    ETag ответов с ролями, бизнес-объектами и правилами доступа.
+
+    Маркер версии таблиц (rbac_state), путь с параметрами и Accept различают
+    разные выборки и форматы.
+    """
+    return make_etag(rbac_state(request)[0], request.get_full_path(), request.META.get('HTTP_ACCEPT', ''))
+
+
+def rbac_last_modified(request, *args, **kwargs):
+    """
+    Last-Modified ответов с ролями, бизнес-объектами и правилами доступа.
+    Удаление строк отражается только в ETag.
+    """
+    return rbac_state(request)[1]
+
+
+# Декоратор обработчиков GET для RoleViewSet, BusinessElementViewSet и AccessRoleRuleViewSet
+rbac_condition = condition(etag_func=rbac_etag, last_modified_func=rbac_last_modified)
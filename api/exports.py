@@ -0,0 +1,121 @@
+"""
+Потоковая выгрузка таблиц в NDJSON и CSV.
+
+Строки читаются курсором на стороне сервера (QuerySet.iterator) пачками по
+EXPORT_CHUNK_SIZE и сразу пишутся в ответ без DRF-сериализаторов, поэтому
+память не зависит от размера таблицы.
+"""
+
+import csv
+import json
+from datetime import date, datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+from django.utils.dateparse import parse_date, parse_datetime
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+
+
+EXPORT_FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+
+FORMAT_QUERY_PARAM = 'export_format'
+
+
+class _Echo:
+    """Псевдо-файл для csv.writer: возвращает строку вместо записи."""
+
+    def write(self, value):
+        return value
+
+
+def _csv_value(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+def _ndjson_lines(rows, fields):
+    for row in rows:
+        yield json.dumps(dict(zip(fields, row)), cls=DjangoJSONEncoder, ensure_ascii=False) + '\n'
+
+
+def _csv_lines(rows, fields):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(fields)
+    for row in rows:
+        yield writer.writerow([_csv_value(value) for value in row])
+
+
+def get_export_format(request) -> str:
+    """
+    Формат выгрузки из параметра export_format (ndjson по умолчанию).
+
+    Raises:
+        ValidationError: если формат не поддерживается
+    """
+    export_format = request.query_params.get(FORMAT_QUERY_PARAM, 'ndjson').lower()
+    if export_format not in EXPORT_FORMATS:
+        raise ValidationError({FORMAT_QUERY_PARAM: f'Поддерживаемые форматы: {", ".join(EXPORT_FORMATS)}'})
+    return export_format
+
+
+def parse_bool_param(request, name: str):
+    """Булев параметр запроса: True, False или None, если параметр не передан."""
+    value = request.query_params.get(name)
+    if value is None or value == '':
+        return None
+    value = value.lower()
+    if value in ('1', 'true', 'yes'):
+        return True
+    if value in ('0', 'false', 'no'):
+        return False
+    raise ValidationError({name: 'Ожидается true или false'})
+
+
+def parse_datetime_param(request, name: str):
+    """
+    Дата или дата-время из параметра запроса (ISO 8601) или None.
+
+    Raises:
+        ValidationError: если значение не распознано
+    """
+    value = request.query_params.get(name)
+    if not value:
+        return None
+
+    parsed = parse_datetime(value)
+    if parsed is None:
+        parsed_date = parse_date(value)
+        if parsed_date is None:
+            raise ValidationError({name: 'Ожидается дата в формате ISO 8601'})
+        parsed = datetime.combine(parsed_date, datetime.min.time())
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed, dt_timezone.utc)
+    return parsed
+
+
+def stream_export(queryset, fields, export_format: str, filename: str) -> StreamingHttpResponse:
+    """
+    Потоковый ответ с выгрузкой queryset.
+
+    Args:
+        queryset: отфильтрованный QuerySet
+        fields: поля (допускаются связи через __)
+        export_format: ndjson или csv
+        filename: имя файла без расширения
+
+    Returns:
+        StreamingHttpResponse
+    """
+    chunk_size = getattr(settings, 'EXPORT_CHUNK_SIZE', 2000)
+    rows = queryset.values_list(*fields).iterator(chunk_size=chunk_size)
+    lines = _csv_lines(rows, fields) if export_format == 'csv' else _ndjson_lines(rows, fields)
+
+    response = StreamingHttpResponse(lines, content_type=EXPORT_FORMATS[export_format])
+    response['Content-Disposition'] = f'attachment; filename="{filename}.{export_format}"'
+    return response
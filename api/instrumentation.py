@@ -0,0 +1,225 @@
+"""
+Замеры времени обработки запросов по этапам.
+
+InstrumentationMiddleware (api/middleware.py) открывает для запроса RequestTimings
+и делает его текущим; этапы внутри запроса отмечают себя через timed(stage):
+- db — выполнение SQL (через connection.execute_wrapper), плюс число запросов;
+- auth — аутентификация в AuthenticationMiddleware;
+- perm — проверки permission_classes DRF;
+- ser — построение данных сериализаторами (serializer.data);
+- render — рендеринг ответа DRF (JSON).
+Этапы могут пересекаться: SQL внутри сериализатора учитывается и в db, и в ser.
+
+Итоги запроса уходят в заголовок Server-Timing и в гистограммы процесса
+(timing_histograms), которые отдает /api/diagnostics/timings/.
+Без middleware timed() ничего не замеряет и почти ничего не стоит.
+"""
+
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+
+STAGES = ('db', 'auth', 'perm', 'ser', 'render')
+
+# Верхние границы корзин гистограмм (мс и число SQL-запросов)
+DURATION_BUCKETS_MS = (1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 200, 500)
+
+_current = ContextVar('request_timings', default=None)
+
+
+class RequestTimings:
+    """
+    Длительности этапов одного запроса.
+
+    Вложенные замеры одного этапа (например, сериализатор внутри сериализатора)
+    учитываются один раз — по внешнему.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.durations = dict.fromkeys(STAGES, 0.0)
+        self.queries = 0
+        self._active = set()
+
+    def add(self, stage: str, seconds: float):
+        self.durations[stage] = self.durations.get(stage, 0.0) + seconds
+
+    def execute_wrapper(self, execute, sql, params, many, context):
+        """Обертка для connection.execute_wrapper: число и время SQL-запросов."""
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.add('db', time.perf_counter() - started)
+
+    def total(self) -> float:
+        return time.perf_counter() - self.started
+
+    def server_timing(self, total: float) -> str:
+        """Значение заголовка Server-Timing (длительности в мс)."""
+        parts = [f'db;dur={self.durations["db"] * 1000:.2f};desc="{self.queries} queries"']
+        parts.extend(f'{stage};dur={self.durations[stage] * 1000:.2f}' for stage in STAGES[1:])
+        parts.append(f'total;dur={total * 1000:.2f}')
+        return ', '.join(parts)
+
+
+def current_timings():
+    """RequestTimings текущего запроса или None, если замеры выключены."""
+    return _current.get()
+
+
+@contextmanager
+def collect():
+    """Сделать новый RequestTimings текущим на время блока."""
+    timings = RequestTimings()
+    token = _current.set(timings)
+    try:
+        yield timings
+    finally:
+        _current.reset(token)
+
+
+@contextmanager
+def timed(stage: str):
+    """
+    Замерить блок как этап stage текущего запроса.
+
+    Args:
+        stage: название этапа (см. STAGES)
+    """
+    timings = _current.get()
+    if timings is None or stage in timings._active:
+        yield
+        return
+
+    timings._active.add(stage)
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings._active.discard(stage)
+        timings.add(stage, time.perf_counter() - started)
+
+
+def timed_method(stage: str):
+    """Декоратор: замерить вызов функции как этап stage."""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with timed(stage):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class Histogram:
+    """Гистограмма с фиксированными корзинами: количество, сумма, максимум."""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def quantile(self, q: float):
+        """Оценка квантиля: верхняя граница корзины, в которую он попадает (не больше максимума)."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for index, bucket_count in enumerate(self.counts):
+            seen += bucket_count
+            if seen >= rank:
+                return min(self.buckets[index], self.max) if index < len(self.buckets) else self.max
+        return self.max
+
+    def to_dict(self) -> dict:
+        bounds = [str(bound) for bound in self.buckets] + ['+Inf']
+        return {
+            'count': self.count,
+            'mean': round(self.sum / self.count, 3) if self.count else None,
+            'max': round(self.max, 3),
+            'p50': self.quantile(0.5),
+            'p95': self.quantile(0.95),
+            'p99': self.quantile(0.99),
+            'buckets': dict(zip(bounds, self.counts)),
+        }
+
+
+class TimingHistograms:
+    """
+    Гистограммы этапов по endpoint'ам ("METHOD view_name"), локальные для процесса.
+    """
+
+    def __init__(self):
+        self._endpoints = {}
+        self._lock = threading.Lock()
+
+    def record(self, endpoint: str, timings: RequestTimings, total: float):
+        """Добавить итоги запроса."""
+        with self._lock:
+            histograms = self._endpoints.get(endpoint)
+            if histograms is None:
+                histograms = self._endpoints[endpoint] = {
+                    'total_ms': Histogram(DURATION_BUCKETS_MS),
+                    'queries': Histogram(QUERY_COUNT_BUCKETS),
+                    **{f'{stage}_ms': Histogram(DURATION_BUCKETS_MS) for stage in STAGES},
+                }
+            histograms['total_ms'].observe(total * 1000)
+            histograms['queries'].observe(timings.queries)
+            for stage in STAGES:
+                histograms[f'{stage}_ms'].observe(timings.durations[stage] * 1000)
+
+    def snapshot(self) -> dict:
+        """Гистограммы {endpoint: {метрика: сводка}}."""
+        with self._lock:
+            return {
+                endpoint: {name: histogram.to_dict() for name, histogram in histograms.items()}
+                for endpoint, histograms in sorted(self._endpoints.items())
+            }
+
+    def clear(self):
+        with self._lock:
+            self._endpoints.clear()
+
+
+timing_histograms = TimingHistograms()
+
+
+_drf_installed = False
+
+
+def install_drf_hooks():
+    """
+    Отметить этапы DRF, которые нельзя обернуть в коде проекта:
+    APIView.check_permissions / check_object_permissions (perm),
+    BaseSerializer.data (ser) и Response.rendered_content (render).
+
+    Вызывается из InstrumentationMiddleware, то есть только при включенных замерах.
+    """
+    global _drf_installed
+    if _drf_installed:
+        return
+
+    from rest_framework.response import Response
+    from rest_framework.serializers import BaseSerializer
+    from rest_framework.views import APIView
+
+    APIView.check_permissions = timed_method('perm')(APIView.check_permissions)
+    APIView.check_object_permissions = timed_method('perm')(APIView.check_object_permissions)
+    BaseSerializer.data = property(timed_method('ser')(BaseSerializer.data.fget))
+    Response.rendered_content = property(timed_method('render')(Response.rendered_content.fget))
+    _drf_installed = True
@@ -0,0 +1,193 @@
+"""
+Команда для замера производительности основных endpoint'ов.
+Использование: python manage.py benchmark [--requests 200] [--users 1000] [--output bench.json]
+
+Замер выполняется во временной тестовой базе (как у тестов Django) через
+тестовый клиент, то есть через полный стек middleware и DRF без сети.
+Для локального запуска без Postgres: DB_ENGINE=django.db.backends.sqlite3.
+Результат — JSON, который можно сравнивать между коммитами.
+"""
+
+import io
+import json
+import platform
+import random
+import statistics
+import time
+
+import django
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, setup_test_environment, teardown_test_environment
+
+from api.activity import activity_tracker
+from api.models import User, Role, BusinessElement
+from api.seeding import seed_roles, seed_elements, seed_rules, seed_users
+
+
+SCENARIOS = (
+    'login',
+    'me',
+    'products_list',
+    'products_retrieve',
+    'users_list',
+    'access_rules_list',
+    'access_rules_by_role',
+)
+
+
+def summarize(durations, queries, statuses, elapsed: float) -> dict:
+    """Сводка по сценарию: RPS, перцентили задержки (мс) и запросы к БД на запрос."""
+    durations_ms = [duration * 1000 for duration in durations]
+    if len(durations_ms) > 1:
+        cuts = statistics.quantiles(durations_ms, n=100, method='inclusive')
+    else:
+        cuts = durations_ms * 99
+    codes = {}
+    for code in statuses:
+        codes[str(code)] = codes.get(str(code), 0) + 1
+    return {
+        'requests': len(durations),
+        'rps': round(len(durations) / elapsed, 2) if elapsed else None,
+        'mean_ms': round(statistics.fmean(durations_ms), 3),
+        'p50_ms': round(cuts[49], 3),
+        'p95_ms': round(cuts[94], 3),
+        'p99_ms': round(cuts[98], 3),
+        'queries_per_request': round(statistics.fmean(queries), 2),
+        'max_queries': max(queries),
+        'status_codes': codes,
+    }
+
+
+class Command(BaseCommand):
+    help = 'Замерить RPS, задержку и число запросов к БД для основных endpoint\'ов'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200, help='Запросов на сценарий')
+        parser.add_argument('--warmup', type=int, default=10, help='Прогревочных запросов на сценарий')
+        parser.add_argument(
+            '--scenario', action='append', choices=SCENARIOS,
+            help='Сценарий (можно повторять; по умолчанию все)'
+        )
+        parser.add_argument('--users', type=int, default=1000, help='Дополнительных пользователей')
+        parser.add_argument('--roles', type=int, default=20, help='Дополнительных ролей')
+        parser.add_argument('--elements', type=int, default=20, help='Дополнительных бизнес-объектов')
+        parser.add_argument('--rule-density', type=float, default=0.5, help='Доля пар роль × объект с правилом')
+        parser.add_argument('--seed', type=int, default=0, help='Seed генератора данных')
+        parser.add_argument('--label', default='', help='Метка запуска (например, коммит)')
+        parser.add_argument('--output', help='Файл для JSON (по умолчанию stdout)')
+
+    def handle(self, *args, **options):
+        if options['requests'] < 1:
+            raise CommandError('--requests должен быть положительным')
+
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            seeded = self._seed(options)
+            result = {
+                'label': options['label'],
+                'meta': {
+                    'python': platform.python_version(),
+                    'django': django.get_version(),
+                    'database': connection.vendor,
+                    'requests_per_scenario': options['requests'],
+                    'seeded': seeded,
+                },
+                'scenarios': self._run(options),
+            }
+            # Отложенные записи активности относятся к тестовой базе
+            activity_tracker.flush()
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        output = json.dumps(result, ensure_ascii=False, indent=2)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                file.write(output + '\n')
+            self.stderr.write(self.style.SUCCESS(f'✓ Результат записан в {options["output"]}'))
+        else:
+            self.stdout.write(output)
+
+    def _seed(self, options) -> dict:
+        call_command('init_db', stdout=io.StringIO())
+        rng = random.Random(options['seed'])
+
+        roles = seed_roles(options['roles'], prefix='BenchRole')
+        elements = seed_elements(options['elements'], prefix='bench-element')
+        rules = seed_rules(
+            roles + list(Role.objects.filter(name__in=['User', 'Guest'])),
+            elements, rng, density=options['rule_density']
+        )
+        password_hash = User.objects.get(email='user1@example.com').password_hash
+        users = seed_users(
+            options['users'], password_hash, list(Role.objects.filter(name='User')) + roles, rng,
+            roles_per_user=2, email_prefix='bench'
+        )
+        return {
+            'users': User.objects.count(),
+            'roles': Role.objects.count(),
+            'elements': BusinessElement.objects.count(),
+            'rules_added': rules,
+            'users_added': users,
+        }
+
+    def _run(self, options) -> dict:
+        client = Client()
+        admin_token = self._login(client, 'admin@example.com', 'admin123')
+        user_token = self._login(client, 'user1@example.com', 'user123')
+        role_id = Role.objects.get(name='Manager').id
+
+        requests = {
+            'login': lambda: client.post(
+                '/api/auth/login/', {'email': 'user1@example.com', 'password': 'user123'},
+                content_type='application/json'
+            ),
+            'me': lambda: client.get('/api/auth/me/', HTTP_AUTHORIZATION=f'Bearer {user_token}'),
+            'products_list': lambda: client.get('/api/products/', HTTP_AUTHORIZATION=f'Bearer {admin_token}'),
+            'products_retrieve': lambda: client.get('/api/products/1/', HTTP_AUTHORIZATION=f'Bearer {admin_token}'),
+            'users_list': lambda: client.get('/api/users/', HTTP_AUTHORIZATION=f'Bearer {admin_token}'),
+            'access_rules_list': lambda: client.get('/api/access-rules/', HTTP_AUTHORIZATION=f'Bearer {admin_token}'),
+            'access_rules_by_role': lambda: client.get(
+                f'/api/access-rules/by_role/?role_id={role_id}', HTTP_AUTHORIZATION=f'Bearer {admin_token}'
+            ),
+        }
+
+        results = {}
+        for name in options['scenario'] or SCENARIOS:
+            send = requests[name]
+            for _ in range(options['warmup']):
+                send()
+                client.cookies.clear()
+
+            durations, queries, statuses = [], [], []
+            started = time.perf_counter()
+            for _ in range(options['requests']):
+                with CaptureQueriesContext(connection) as captured:
+                    request_started = time.perf_counter()
+                    response = send()
+                    durations.append(time.perf_counter() - request_started)
+                queries.append(len(captured))
+                statuses.append(response.status_code)
+                # Cookie сессии от логина не должна влиять на следующие запросы
+                client.cookies.clear()
+            results[name] = summarize(durations, queries, statuses, time.perf_counter() - started)
+            self.stderr.write(
+                f'{name:>22}: {results[name]["rps"]:>9} rps, p50 {results[name]["p50_ms"]} мс, '
+                f'p99 {results[name]["p99_ms"]} мс, {results[name]["queries_per_request"]} запросов'
+            )
+        return results
+
+    @staticmethod
+    def _login(client, email: str, password: str) -> str:
+        response = client.post(
+            '/api/auth/login/', {'email': email, 'password': password}, content_type='application/json'
+        )
+        if response.status_code != 200:
+            raise CommandError(f'Не удалось войти как {email}: {response.status_code}')
+        client.cookies.clear()
+        return response.json()['token']
+
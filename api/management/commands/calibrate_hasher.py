@@ -0,0 +1,68 @@
+"""
+Команда для подбора стоимости хеширования паролей на текущей машине.
+Использование: python manage.py calibrate_hasher [--algorithm bcrypt] [--target-ms 250]
+"""
+
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.passwords import HASHERS, get_hasher
+
+
+class Command(BaseCommand):
+    help = 'Измерить время хеширования и подобрать стоимость под целевую задержку логина'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--algorithm', choices=sorted(HASHERS), default=None,
+            help='Алгоритм (по умолчанию PASSWORD_HASHER)'
+        )
+        parser.add_argument(
+            '--target-ms', type=float, default=250.0,
+            help='Целевое время одного хеширования в миллисекундах'
+        )
+        parser.add_argument(
+            '--samples', type=int, default=3,
+            help='Число замеров на каждую стоимость'
+        )
+
+    def handle(self, *args, **options):
+        hasher_class = type(get_hasher(options['algorithm']))
+        target_ms = options['target_ms']
+        samples = max(1, options['samples'])
+
+        if target_ms <= 0:
+            raise CommandError('--target-ms должен быть положительным')
+
+        self.stdout.write(
+            f'Алгоритм: {hasher_class.algorithm}, цель: {target_ms:.0f} мс, '
+            f'текущая стоимость: {hasher_class().cost}'
+        )
+
+        suggested = None
+        for cost in range(hasher_class.min_cost, hasher_class.max_cost + 1):
+            hasher = hasher_class(cost)
+            timings = []
+            for _ in range(samples):
+                started = time.perf_counter()
+                hasher.encode('calibration-password')
+                timings.append((time.perf_counter() - started) * 1000)
+
+            median_ms = statistics.median(timings)
+            self.stdout.write(f'  cost={cost:>2}: {median_ms:8.1f} мс')
+
+            if median_ms > target_ms:
+                break
+            suggested = cost
+
+        if suggested is None:
+            self.stdout.write(self.style.WARNING(
+                f'Даже минимальная стоимость {hasher_class.min_cost} превышает цель'
+            ))
+            suggested = hasher_class.min_cost
+
+        self.stdout.write(self.style.SUCCESS(
+            f'\nРекомендуется: {hasher_class.cost_setting}={suggested}'
+        ))
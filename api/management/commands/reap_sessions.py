@@ -0,0 +1,34 @@
+"""
+Команда для удаления истекших сессий.
+Использование: python manage.py reap_sessions [--batch-size 1000] [--sleep 0.1]
+"""
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from api.session_reaper import reap_expired_sessions
+
+
+class Command(BaseCommand):
+    help = 'Удалить истекшие сессии пачками'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int,
+            default=getattr(settings, 'SESSION_REAPER_BATCH_SIZE', 1000),
+            help='Количество сессий, удаляемых одним запросом'
+        )
+        parser.add_argument(
+            '--sleep', type=float,
+            default=getattr(settings, 'SESSION_REAPER_SLEEP', 0.1),
+            help='Пауза между пачками в секундах'
+        )
+
+    def handle(self, *args, **options):
+        result = reap_expired_sessions(
+            batch_size=max(1, options['batch_size']),
+            sleep=max(0.0, options['sleep'])
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'✓ Удалено истекших сессий: {result["deleted"]} за {result["duration"]:.2f} с'
+        ))
@@ -0,0 +1,104 @@
+"""
+Команда для генерации больших синтетических наборов данных.
+Использование: python manage.py seed_scale --users 1000000 [--roles 50] [--elements 30]
+    [--rule-density 0.3] [--max-roles-per-user 3] [--batch-size 5000] [--prefix seed]
+
+Пользователи, роли, бизнес-объекты и правила вставляются bulk_create пачками;
+пароль хешируется один раз, и хеш используется для всех пользователей.
+bulk_create не отправляет post_save, поэтому после ролей, объектов и правил
+версия матрицы прав поднимается явно (access_matrix.bump_version()).
+Повторный запуск с другим --prefix добавляет новые данные к существующим.
+"""
+
+import random
+import time
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+
+from api.access_matrix import access_matrix
+from api.models import Role, BusinessElement, User
+from api.passwords import get_hasher
+from api.seeding import geometric_role_count, seed_roles, seed_elements, seed_rules, seed_users
+
+
+class Command(BaseCommand):
+    help = 'Сгенерировать N пользователей, M ролей, K бизнес-объектов и правила доступа'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100000, help='Количество пользователей')
+        parser.add_argument('--roles', type=int, default=50, help='Количество ролей')
+        parser.add_argument('--elements', type=int, default=30, help='Количество бизнес-объектов')
+        parser.add_argument(
+            '--rule-density', type=float, default=0.3,
+            help='Доля пар роль × объект, для которых создается правило'
+        )
+        parser.add_argument(
+            '--max-roles-per-user', type=int, default=3,
+            help='Максимум ролей у пользователя (у большинства — одна)'
+        )
+        parser.add_argument('--batch-size', type=int, default=5000, help='Размер пачки вставки')
+        parser.add_argument('--prefix', default='seed', help='Префикс имен ролей, объектов и email')
+        parser.add_argument('--password', default='password123', help='Пароль всех пользователей')
+        parser.add_argument('--seed', type=int, default=0, help='Seed генератора данных')
+        parser.add_argument(
+            '--with-base', action='store_true',
+            help='Сначала выполнить init_db (базовые роли, объекты и тестовые аккаунты)'
+        )
+
+    def handle(self, *args, **options):
+        prefix = options['prefix']
+        if min(options['users'], options['roles'], options['elements']) < 0:
+            raise CommandError('Количества не могут быть отрицательными')
+        if options['users'] and not options['roles']:
+            raise CommandError('Для пользователей нужна хотя бы одна роль (--roles)')
+        if not 0 <= options['rule_density'] <= 1:
+            raise CommandError('--rule-density должен быть в диапазоне [0, 1]')
+        if Role.objects.filter(name__startswith=f'{prefix}-').exists() or \
+           User.objects.filter(email__startswith=f'{prefix}-', email__endswith='@seed.local').exists():
+            raise CommandError(f'Данные с префиксом "{prefix}" уже есть, укажите другой --prefix')
+
+        if options['with_base']:
+            call_command('init_db')
+
+        rng = random.Random(options['seed'])
+        batch_size = max(1, options['batch_size'])
+        started = time.monotonic()
+
+        roles = seed_roles(options['roles'], prefix=prefix)
+        self.stdout.write(self.style.SUCCESS(f'✓ Ролей создано: {len(roles)}'))
+
+        elements = seed_elements(options['elements'], prefix=prefix)
+        self.stdout.write(self.style.SUCCESS(f'✓ Бизнес-объектов создано: {len(elements)}'))
+
+        rules = seed_rules(roles, elements, rng, density=options['rule_density'], batch_size=batch_size)
+        self.stdout.write(self.style.SUCCESS(f'✓ Правил доступа создано: {rules}'))
+
+        # Сигналы не срабатывают при bulk_create: запущенный сервер должен перестроить матрицу
+        access_matrix.bump_version()
+
+        # Один хеш на всех пользователей: стоимость bcrypt не умножается на N
+        password_hash = get_hasher().encode(options['password'])
+
+        total = options['users']
+        users_started = time.monotonic()
+
+        def progress(created):
+            elapsed = time.monotonic() - users_started
+            rate = created / elapsed if elapsed else 0
+            self.stdout.write(f'  пользователи: {created}/{total} ({created * 100 // total}%, {rate:.0f}/с)')
+            self.stdout.flush()
+
+        users = seed_users(
+            total, password_hash, roles, rng,
+            roles_per_user=geometric_role_count(max(1, options['max_roles_per_user'])),
+            email_prefix=prefix, batch_size=batch_size, progress=progress
+        )
+        self.stdout.write(self.style.SUCCESS(f'✓ Пользователей создано: {users}'))
+
+        self.stdout.write(self.style.SUCCESS(
+            f'\n✓ Генерация завершена за {time.monotonic() - started:.1f} с. '
+            f'Всего: пользователей {User.objects.count()}, ролей {Role.objects.count()}, '
+            f'бизнес-объектов {BusinessElement.objects.count()}'
+        ))
+        self.stdout.write(f'Пароль пользователей {prefix}-N@seed.local: {options["password"]}')
@@ -0,0 +1,362 @@
+"""
+Метрики процесса в формате Prometheus (text exposition format 0.0.4).
+
+Реестр хранит счетчики, gauge и гистограммы в памяти процесса; внешний
+сервис не нужен. Метрики отдает /api/diagnostics/metrics/ (только Admin).
+
+При нескольких воркерах (gunicorn и т. п.) задается общий каталог
+METRICS_MULTIPROCESS_DIR: каждый процесс сохраняет туда свои значения
+(не чаще, чем раз в METRICS_FLUSH_INTERVAL секунд, и при завершении),
+а endpoint суммирует файлы всех процессов. Счетчики и гистограммы
+завершившихся процессов продолжают учитываться, gauge — только живых.
+Каталог нужно очищать при перезапуске сервиса.
+"""
+
+import atexit
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from contextlib import ContextDecorator
+
+from django.conf import settings
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+class _Timer(ContextDecorator):
+    """Замер длительности блока или функции в гистограмму."""
+
+    def __init__(self, histogram, labels):
+        self._histogram = histogram
+        self._labels = labels
+
+    def _recreate_cm(self):
+        # Отдельный экземпляр на вызов: декорированная функция может выполняться в нескольких потоках
+        return _Timer(self._histogram, self._labels)
+
+    def __enter__(self):
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._histogram.observe(time.perf_counter() - self._started, **self._labels)
+        return False
+
+
+class Metric:
+    """
+    Базовая метрика: значения по наборам меток {(значения меток): значение}.
+    """
+
+    type = None
+
+    def __init__(self, registry, name: str, documentation: str, labelnames=()):
+        self._registry = registry
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+
+    def _key(self, labels: dict) -> tuple:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f'Метрика {self.name} ожидает метки {self.labelnames}, получены {tuple(labels)}')
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def dump(self) -> dict:
+        """Значения для записи в файл процесса: {json-ключ меток: значение}."""
+        return {json.dumps(key): self._dump_value(value) for key, value in self._values.items()}
+
+    def _dump_value(self, value):
+        return value
+
+
+class Counter(Metric):
+    """Монотонно растущий счетчик."""
+
+    type = 'counter'
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._registry.lock:
+            self._values[key] = self._values.get(key, 0) + amount
+        self._registry.maybe_flush()
+
+
+class Gauge(Metric):
+    """Текущее значение (может уменьшаться)."""
+
+    type = 'gauge'
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._registry.lock:
+            self._values[key] = value
+        self._registry.maybe_flush()
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._registry.lock:
+            self._values[key] = self._values.get(key, 0) + amount
+        self._registry.maybe_flush()
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+
+class Histogram(Metric):
+    """Распределение значений по корзинам (значение — [счетчики корзин, сумма])."""
+
+    type = 'histogram'
+
+    def __init__(self, registry, name: str, documentation: str, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(registry, name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._registry.lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            entry[0][bisect_left(self.buckets, value)] += 1
+            entry[1] += value
+        self._registry.maybe_flush()
+
+    def time(self, **labels) -> _Timer:
+        """Контекстный менеджер / декоратор для замера длительности в секундах."""
+        return _Timer(self, labels)
+
+    def _dump_value(self, value):
+        return [list(value[0]), value[1]]
+
+
+class MetricsRegistry:
+    """
+    Реестр метрик процесса с выгрузкой в text exposition format.
+    """
+
+    def __init__(self, multiprocess_dir=None, flush_interval=None):
+        self._multiprocess_dir = multiprocess_dir
+        self._flush_interval = flush_interval
+        self._metrics = {}
+        self._last_flush = 0.0
+        self.lock = threading.Lock()
+
+    @property
+    def multiprocess_dir(self) -> str:
+        if self._multiprocess_dir is None:
+            return getattr(settings, 'METRICS_MULTIPROCESS_DIR', '')
+        return self._multiprocess_dir
+
+    @property
+    def flush_interval(self) -> float:
+        if self._flush_interval is None:
+            return getattr(settings, 'METRICS_FLUSH_INTERVAL', 5)
+        return self._flush_interval
+
+    def _register(self, metric):
+        if metric.name in self._metrics:
+            raise ValueError(f'Метрика {metric.name} уже зарегистрирована')
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames=()) -> Counter:
+        return self._register(Counter(self, name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames=()) -> Gauge:
+        return self._register(Gauge(self, name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames=(), buckets=DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(self, name, documentation, labelnames, buckets))
+
+    def maybe_flush(self):
+        """Сохранить значения процесса в общий каталог, если прошел интервал."""
+        if not self.multiprocess_dir:
+            return
+        now = time.monotonic()
+        if now - self._last_flush >= self.flush_interval:
+            self._last_flush = now
+            self.flush()
+
+    def flush(self):
+        """Записать значения процесса в {METRICS_MULTIPROCESS_DIR}/metrics-{pid}.json."""
+        directory = self.multiprocess_dir
+        if not directory:
+            return
+        with self.lock:
+            data = {name: metric.dump() for name, metric in self._metrics.items()}
+        try:
+            os.makedirs(directory, exist_ok=True)
+            fd, tmp_name = tempfile.mkstemp(dir=directory, suffix='.tmp')
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(data, f)
+            os.replace(tmp_name, os.path.join(directory, f'metrics-{os.getpid()}.json'))
+        except OSError:
+            logger.exception('Не удалось сохранить метрики в %s', directory)
+
+    def collect(self) -> dict:
+        """
+        Значения всех метрик {имя: {ключ меток: значение}}.
+
+        При заданном METRICS_MULTIPROCESS_DIR — сумма по файлам всех процессов.
+        """
+        if not self.multiprocess_dir:
+            with self.lock:
+                return {name: metric.dump() for name, metric in self._metrics.items()}
+
+        self.flush()
+        totals = {name: {} for name in self._metrics}
+        for pid, data in self._read_process_files():
+            alive = _pid_alive(pid)
+            for name, values in data.items():
+                metric = self._metrics.get(name)
+                if metric is None or (metric.type == 'gauge' and not alive):
+                    continue
+                merged = totals[name]
+                for key, value in values.items():
+                    merged[key] = _merge(metric, merged.get(key), value)
+        return totals
+
+    def render(self) -> str:
+        """Метрики в text exposition format."""
+        collected = self.collect()
+        lines = []
+        for name, metric in self._metrics.items():
+            lines.append(f'# HELP {name} {_escape_help(metric.documentation)}')
+            lines.append(f'# TYPE {name} {metric.type}')
+            for key, value in sorted(collected.get(name, {}).items()):
+                labels = list(zip(metric.labelnames, json.loads(key)))
+                if metric.type == 'histogram':
+                    lines.extend(_histogram_lines(name, metric.buckets, labels, value))
+                else:
+                    lines.append(f'{name}{_format_labels(labels)} {_format_value(value)}')
+        return '\n'.join(lines) + '\n'
+
+    def _read_process_files(self):
+        directory = self.multiprocess_dir
+        try:
+            entries = list(os.scandir(directory))
+        except OSError:
+            return
+        for entry in entries:
+            if not (entry.name.startswith('metrics-') and entry.name.endswith('.json')):
+                continue
+            try:
+                pid = int(entry.name[len('metrics-'):-len('.json')])
+                with open(entry.path, encoding='utf-8') as f:
+                    yield pid, json.load(f)
+            except (OSError, ValueError):
+                continue
+
+
+def _pid_alive(pid: int) -> bool:
+    if pid == os.getpid():
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _merge(metric, current, value):
+    if current is None:
+        return value
+    if metric.type == 'histogram':
+        return [[a + b for a, b in zip(current[0], value[0])], current[1] + value[1]]
+    return current + value
+
+
+def _histogram_lines(name: str, buckets, labels, value):
+    counts, total = value
+    cumulative = 0
+    for bound, count in zip(list(buckets) + ['+Inf'], counts):
+        cumulative += count
+        le = bound if bound == '+Inf' else _format_value(bound)
+        yield f'{name}_bucket{_format_labels(labels + [("le", le)])} {cumulative}'
+    yield f'{name}_sum{_format_labels(labels)} {_format_value(total)}'
+    yield f'{name}_count{_format_labels(labels)} {cumulative}'
+
+
+def _format_labels(labels) -> str:
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape_label(value)}"' for name, value in labels) + '}'
+
+
+def _escape_label(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_value(value) -> str:
+    if isinstance(value, float) and value.is_integer():
+        return f'{value:.1f}'
+    return repr(value)
+
+
+def _escape_help(text: str) -> str:
+    return text.replace('\\', '\\\\').replace('\n', '\\n')
+
+
+registry = MetricsRegistry()
+atexit.register(registry.flush)
+
+
+# Метрики горячих путей аутентификации
+
+login_attempts = registry.counter(
+    'auth_login_attempts_total', 'Попытки входа по результату', ['result']
+)
+login_duration = registry.histogram(
+    'auth_login_duration_seconds', 'Время обработки POST /api/auth/login/'
+)
+password_check_duration = registry.histogram(
+    'auth_password_check_duration_seconds', 'Время проверки пароля (bcrypt/scrypt) при входе'
+)
+password_checks_in_progress = registry.gauge(
+    'auth_password_checks_in_progress', 'Проверки пароля, выполняемые в данный момент'
+)
+jwt_authentications = registry.counter(
+    'auth_jwt_authentications_total', 'Аутентификации по JWT по результату', ['result']
+)
+jwt_decode_duration = registry.histogram(
+    'auth_jwt_decode_duration_seconds', 'Время jwt.decode (без попаданий в кеш токенов)',
+    buckets=(0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025)
+)
+session_lookups = registry.counter(
+    'auth_session_lookups_total', 'Аутентификации по cookie сессии по результату', ['result']
+)
+session_lookup_duration = registry.histogram(
+    'auth_session_lookup_duration_seconds', 'Время загрузки сессии из хранилища',
+    buckets=(0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1)
+)
+permission_checks = registry.counter(
+    'auth_permission_checks_total', 'Проверки has_permission по действию и результату', ['action', 'result']
+)
+
+
+def record_permission_checks(checks, results):
+    """
+    Учесть пакетную проверку прав в permission_checks — по одной на проверку.
+
+    Args:
+        checks: список (element_name, action, target_user_id)
+        results: список bool в порядке checks
+    """
+    totals = defaultdict(int)
+    for (_, action, _), allowed in zip(checks, results):
+        totals[action, 'allowed' if allowed else 'denied'] += 1
+    for (action, result), amount in totals.items():
+        permission_checks.inc(amount, action=action, result=result)
@@ -1,17 +1,23 @@
 """
-Middleware для обработки аутентификации и присваивания request.user.
+Middleware для обработки аутентификации и присваивания request.user,
+а также для замеров времени обработки запросов (включается отдельно).
 """
 
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
 from django.utils.deprecation import MiddlewareMixin
 from rest_framework.exceptions import AuthenticationFailed
-from .authentication import JWTAuthentication, SessionAuthentication
-from .models import User
+from .authentication import authenticate_request
+from .instrumentation import collect, timed, timing_histograms, install_drf_hooks
 
 
 class AuthenticationMiddleware(MiddlewareMixin):
     """
     Middleware для аутентификации пользователя и присваивания request.user.
     Пытается аутентифицировать через JWT, затем через сессии.
+    Результат переиспользуется в DRF через MiddlewareAuthentication.
     """
 
     def process_request(self, request):
@@ -22,25 +28,47 @@ class AuthenticationMiddleware(MiddlewareMixin):
         request.user = None
         request.auth = None
 
-        # Попытаться аутентифицировать через JWT
-        jwt_auth = JWTAuthentication()
         try:
-            auth_result = jwt_auth.authenticate(request)
-            if auth_result:
-                request.user, request.auth = auth_result
-                return None
+            with timed('auth'):
+                auth_result = authenticate_request(request)
         except AuthenticationFailed:
-            pass
+            auth_result = None
 
-        # Попытаться аутентифицировать через сессии
-        session_auth = SessionAuthentication()
-        try:
-            auth_result = session_auth.authenticate(request)
-            if auth_result:
-                request.user, request.auth = auth_result
-                return None
-        except AuthenticationFailed:
-            pass
+        if auth_result:
+            request.user, request.auth = auth_result
 
         # Если аутентификация не удалась, пользователь остается None
         return None
+
+
+class InstrumentationMiddleware:
+    """
+    Middleware для замеров запроса: число и время SQL-запросов, время
+    аутентификации, проверок прав, сериализации и рендеринга.
+
+    Ставится перед AuthenticationMiddleware (см. REQUEST_INSTRUMENTATION).
+    Итоги добавляются в заголовок Server-Timing (REQUEST_INSTRUMENTATION_HEADER)
+    и в гистограммы процесса (api/instrumentation.py). Для потоковых ответов
+    учитывается только время до начала отдачи тела.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        install_drf_hooks()
+
+    def __call__(self, request):
+        with collect() as timings, ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(timings.execute_wrapper))
+            response = self.get_response(request)
+
+        total = timings.total()
+        timing_histograms.record(self._endpoint(request), timings, total)
+        if getattr(settings, 'REQUEST_INSTRUMENTATION_HEADER', True):
+            response['Server-Timing'] = timings.server_timing(total)
+        return response
+
+    @staticmethod
+    def _endpoint(request) -> str:
+        match = getattr(request, 'resolver_match', None)
+        return f'{request.method} {match.view_name if match else "unresolved"}'
@@ -12,9 +12,28 @@
 
 from django.db import models
 from django.utils import timezone
-import bcrypt
 import uuid
 
+from .access_matrix import access_matrix
+from .passwords import password_hashing, needs_rehash
+from .metrics import permission_checks, record_permission_checks
+
+
+class UserQuerySet(models.QuerySet):
+    """QuerySet пользователей."""
+
+    def with_roles(self):
+        """
+        Подгрузить роли пользователей (UserRole вместе с Role) одним запросом
+        на всю выборку, чтобы сериализаторы не делали запрос на каждого пользователя.
+        """
+        return self.prefetch_related(roles_prefetch())
+
+
+def roles_prefetch():
+    """Prefetch ролей пользователя: UserRole с присоединенной Role."""
+    return models.Prefetch('roles', queryset=UserRole.objects.select_related('role'))
+
 
 class User(models.Model):
     """
@@ -30,23 +49,37 @@ class User(models.Model):
     created_at = models.DateTimeField(auto_now_add=True, verbose_name='Создан')
     updated_at = models.DateTimeField(auto_now=True, verbose_name='Обновлен')
 
+    objects = UserQuerySet.as_manager()
+
     class Meta:
         db_table = 'users'
         verbose_name = 'Пользователь'
         verbose_name_plural = 'Пользователи'
         ordering = ['-created_at']
+        indexes = [
+            # Для курсорной пагинации по (created_at, id)
+            models.Index(fields=['-created_at', '-id'], name='users_created_id_idx'),
+        ]
 
     def __str__(self):
         return f"{self.first_name} {self.last_name} ({self.email})"
 
+    @property
+    def is_authenticated(self) -> bool:
+        """Загруженный пользователь всегда аутентифицирован (для DRF permissions)."""
+        return True
+
     def set_password(self, password: str):
-        """Хеширование и сохранение пароля с использованием bcrypt."""
-        salt = bcrypt.gensalt(rounds=12)
-        self.password_hash = bcrypt.hashpw(password.encode('utf-8'), salt).decode('utf-8')
+        """Хеширование и сохранение пароля текущим хешером (в пуле хеширования)."""
+        self.password_hash = password_hashing.hash_password(password)
 
     def check_password(self, password: str) -> bool:
-        """Проверка пароля против хеша."""
-        return bcrypt.checkpw(password.encode('utf-8'), self.password_hash.encode('utf-8'))
+        """Проверка пароля против хеша (в пуле хеширования)."""
+        return password_hashing.check_password(password, self.password_hash)
+
+    def password_needs_rehash(self) -> bool:
+        """Устарели ли алгоритм или стоимость сохраненного хеша."""
+        return needs_rehash(self.password_hash)
 
     def get_full_name(self) -> str:
         """Получить полное имя пользователя."""
@@ -55,6 +88,29 @@ class User(models.Model):
             parts.append(self.patronymic)
         return ' '.join(parts)
 
+    def get_role_snapshot(self) -> dict:
+        """
+        Роли пользователя в виде {role_id: role_name}.
+
+        Загружаются одним запросом с JOIN и кешируются на объекте. Объект
+        пользователя создается заново на каждый запрос, поэтому все проверки
+        в рамках запроса используют один снимок.
+        """
+        snapshot = getattr(self, '_role_snapshot', None)
+        if snapshot is None:
+            snapshot = dict(self.roles.values_list('role_id', 'role__name'))
+            self._role_snapshot = snapshot
+        return snapshot
+
+    @property
+    def role_ids(self) -> list:
+        """ID ролей пользователя."""
+        return list(self.get_role_snapshot())
+
+    def has_role(self, *role_names: str) -> bool:
+        """Проверить, есть ли у пользователя хотя бы одна из ролей."""
+        return any(name in role_names for name in self.get_role_snapshot().values())
+
     def has_permission(self, element_name: str, action: str, target_user_id=None) -> bool:
         """
         Проверить, имеет ли пользователь право на действие с объектом.
@@ -68,43 +124,37 @@ class User(models.Model):
             True если пользователь имеет право, иначе False
         """
         if not self.is_active:
+            permission_checks.inc(action=action, result='denied')
             return False
 
-        # Получить все роли пользователя
-        user_roles = self.roles.all()
+        # Роли берутся из снимка, правила — из матрицы в памяти
+        is_owner = target_user_id is not None and str(target_user_id) == str(self.id)
+        allowed = access_matrix.check(self.get_role_snapshot(), element_name, action, is_owner)
+        permission_checks.inc(action=action, result='allowed' if allowed else 'denied')
+        return allowed
 
-        # Получить бизнес-объект
-        try:
-            element = BusinessElement.objects.get(name=element_name)
-        except BusinessElement.DoesNotExist:
-            return False
+    def get_permission_matrix(self) -> dict:
+        """Эффективные права пользователя {element_name: {action: bool}} по всем ролям."""
+        if not self.is_active:
+            return {}
+        return access_matrix.permission_matrix(self.get_role_snapshot())
 
-        # Проверить правила доступа для каждой роли
-        for role in user_roles:
-            try:
-                rule = AccessRoleRule.objects.get(role=role, element=element)
-                
-                # Проверить действие
-                if action == 'read':
-                    if rule.read_permission or rule.read_all_permission:
-                        return True
-                elif action == 'create':
-                    if rule.create_permission:
-                        return True
-                elif action == 'update':
-                    if rule.update_all_permission:
-                        return True
-                    if rule.update_permission and target_user_id == self.id:
-                        return True
-                elif action == 'delete':
-                    if rule.delete_all_permission:
-                        return True
-                    if rule.delete_permission and target_user_id == self.id:
-                        return True
-            except AccessRoleRule.DoesNotExist:
-                continue
-
-        return False
+    def check_permissions(self, checks) -> list:
+        """
+        Проверить несколько прав за одну загрузку ролей и правил.
+
+        Args:
+            checks: список (element_name, action, target_user_id)
+
+        Returns:
+            список bool в порядке checks
+        """
+        if not self.is_active:
+            results = [False] * len(checks)
+        else:
+            results = access_matrix.check_many(self.get_role_snapshot(), self.id, checks)
+        record_permission_checks(checks, results)
+        return results
 
 
 class Role(models.Model):
@@ -115,6 +165,7 @@ class Role(models.Model):
     name = models.CharField(max_length=100, unique=True, verbose_name='Название')
     description = models.TextField(blank=True, verbose_name='Описание')
     created_at = models.DateTimeField(auto_now_add=True, verbose_name='Создана')
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='Обновлена')
 
     class Meta:
         db_table = 'roles'
@@ -153,6 +204,7 @@ class BusinessElement(models.Model):
     name = models.CharField(max_length=100, unique=True, verbose_name='Название')
     description = models.TextField(blank=True, verbose_name='Описание')
     created_at = models.DateTimeField(auto_now_add=True, verbose_name='Создан')
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='Обновлен')
 
     class Meta:
         db_table = 'business_elements'
@@ -196,6 +248,10 @@ class AccessRoleRule(models.Model):
         verbose_name = 'Правило доступа'
         verbose_name_plural = 'Правила доступа'
         unique_together = ('role', 'element')
+        indexes = [
+            # Для курсорной пагинации по (created_at, id)
+            models.Index(fields=['-created_at', '-id'], name='access_rules_created_id_idx'),
+        ]
 
     def __str__(self):
         return f"{self.role} -> {self.element}"
@@ -212,13 +268,20 @@ class Session(models.Model):
     user_agent = models.TextField(blank=True, verbose_name='User Agent')
     created_at = models.DateTimeField(auto_now_add=True, verbose_name='Создана')
     expires_at = models.DateTimeField(verbose_name='Истекает')
-    last_activity = models.DateTimeField(auto_now=True, verbose_name='Последняя активность')
+    # Обновляется пачками через api.activity, а не при каждом save()
+    last_activity = models.DateTimeField(default=timezone.now, verbose_name='Последняя активность')
 
     class Meta:
         db_table = 'sessions'
         verbose_name = 'Сессия'
         verbose_name_plural = 'Сессии'
         ordering = ['-last_activity']
+        indexes = [
+            # Для пакетного удаления истекших сессий
+            models.Index(fields=['expires_at'], name='sessions_expires_at_idx'),
+            # Для курсорной пагинации по (last_activity, id)
+            models.Index(fields=['-last_activity', '-id'], name='sessions_activity_id_idx'),
+        ]
 
     def __str__(self):
         return f"Session {self.user} ({self.created_at})"
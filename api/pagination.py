@@ -0,0 +1,171 @@
+"""
+Пагинация для больших списков.
+
+Курсорная (keyset) пагинация не использует OFFSET и COUNT(*): страница
+выбирается условием по (timestamp, id) с опорой на составной индекс, и
+время ответа не зависит от глубины страницы. Общее количество записей
+возвращается только по запросу (?count=true).
+
+Для данных вне БД RepositoryCursorPagination делает то же поверх
+сортированных индексов репозитория.
+"""
+
+import binascii
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.pagination import CursorPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(CursorPagination):
+    """
+    Базовая курсорная пагинация с настраиваемым размером страницы.
+    """
+    ordering = ('-created_at', '-id')
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    count_query_param = 'count'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.include_count = request.query_params.get(self.count_query_param, '').lower() in ('1', 'true')
+        self.count = queryset.count() if self.include_count else None
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        response = super().get_paginated_response(data)
+        if self.include_count:
+            response.data['count'] = self.count
+        return response
+
+    def get_paginated_response_schema(self, schema):
+        schema = super().get_paginated_response_schema(schema)
+        schema['properties']['count'] = {'type': 'integer', 'nullable': True}
+        return schema
+
+
+class UserPagination(KeysetPagination):
+    """Пользователи: новые сначала."""
+    ordering = ('-created_at', '-id')
+
+
+class SessionPagination(KeysetPagination):
+    """Сессии: последние активные сначала."""
+    ordering = ('-last_activity', '-id')
+
+
+class AccessRoleRulePagination(KeysetPagination):
+    """Правила доступа: новые сначала."""
+    ordering = ('-created_at', '-id')
+
+
+class RepositoryCursorPagination:
+    """
+    Курсорная пагинация выборок из репозиториев (api/repositories.py).
+
+    Курсор хранит позицию (значение поля сортировки, id) последней или первой
+    записи страницы, поэтому следующая страница читается из сортированного
+    индекса с этой позиции, а не отсчетом от начала.
+    """
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    ordering_param = 'ordering'
+    ordering_fields = ('id',)
+    default_ordering = 'id'
+    invalid_cursor_message = 'Неверный курсор'
+
+    def get_ordering(self, request) -> str:
+        ordering = request.query_params.get(self.ordering_param, self.default_ordering)
+        if ordering.lstrip('-') not in self.ordering_fields:
+            raise ValidationError({
+                self.ordering_param: f'Допустимые значения: {", ".join(self.ordering_fields)} (с "-" — по убыванию)'
+            })
+        return ordering
+
+    def get_page_size(self, request) -> int:
+        value = request.query_params.get(self.page_size_query_param)
+        if not value:
+            return self.page_size
+        try:
+            return max(1, min(int(value), self.max_page_size))
+        except ValueError:
+            raise ValidationError({self.page_size_query_param: 'Ожидается целое число'})
+
+    def decode_cursor(self, request, ordering: str):
+        """Позиция (значение, id) и направление из параметра cursor или None."""
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            cursor = json.loads(urlsafe_b64decode(encoded.encode('ascii')))
+            if cursor['o'] != ordering:
+                raise ValueError
+            return (cursor['v'], int(cursor['id'])), bool(cursor['r'])
+        except (TypeError, ValueError, KeyError, UnicodeError, binascii.Error):
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, item: dict, ordering: str, reverse: bool) -> str:
+        cursor = {'o': ordering, 'v': item[ordering.lstrip('-')], 'id': item['id'], 'r': int(reverse)}
+        encoded = urlsafe_b64encode(json.dumps(cursor, separators=(',', ':')).encode()).decode('ascii')
+        return replace_query_param(self.request.build_absolute_uri(), self.cursor_query_param, encoded)
+
+    def paginate_repository(self, repository, request, filters: dict) -> list:
+        """
+        Страница записей репозитория.
+
+        Args:
+            repository: репозиторий
+            request: запрос
+            filters: условия выборки (см. BaseRepository.query) или None,
+                если выборка заведомо пуста
+
+        Returns:
+            записи страницы
+        """
+        self.request = request
+        ordering = self.get_ordering(request)
+        page_size = self.get_page_size(request)
+        decoded = self.decode_cursor(request, ordering)
+        position, reverse = decoded if decoded else (None, False)
+
+        if filters is None:
+            self.next_link = self.previous_link = None
+            return []
+
+        try:
+            items, has_more = repository.query(
+                filters, ordering=ordering,
+                after=None if reverse else position,
+                before=position if reverse else None,
+                limit=page_size
+            )
+        except TypeError:
+            # Значение курсора несравнимо с полем сортировки
+            raise NotFound(self.invalid_cursor_message)
+
+        has_next = has_more if not reverse else position is not None
+        has_previous = has_more if reverse else position is not None
+        self.next_link = self.encode_cursor(items[-1], ordering, False) if has_next and items else None
+        self.previous_link = self.encode_cursor(items[0], ordering, True) if has_previous and items else None
+        return items
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.next_link,
+            'previous': self.previous_link,
+            'results': data,
+        })
+
+
+class ProductPagination(RepositoryCursorPagination):
+    """Товары: сортировка по id, цене или названию."""
+    ordering_fields = ('id', 'price', 'name')
+
+
+class OrderPagination(RepositoryCursorPagination):
+    """Заказы: сортировка по id, количеству или сумме."""
+    ordering_fields = ('id', 'quantity', 'total')
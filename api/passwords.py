@@ -0,0 +1,300 @@
+"""
+Хешеры паролей и сервис хеширования.
+
+Хешеры регистрируются по названию алгоритма. Новые хеши создаются
+алгоритмом PASSWORD_HASHER со стоимостью из настроек (BCRYPT_ROUNDS,
+SCRYPT_COST); алгоритм и стоимость сохраненного хеша определяются по его
+формату, что позволяет перехешировать устаревшие пароли при входе.
+
+Хеширование занимает процессор на сотни миллисекунд, поэтому оно
+выполняется в отдельном пуле потоков ограниченного размера (bcrypt и
+hashlib.scrypt освобождают GIL). Число задач в работе и в очереди тоже
+ограничено: при переполнении запрос сразу получает 503, а не занимает
+воркер сервера.
+
+Настройки пула:
+- PASSWORD_HASHING_WORKERS: число потоков пула
+- PASSWORD_HASHING_QUEUE_SIZE: сколько задач может ждать сверх работающих
+- PASSWORD_HASHING_TIMEOUT: максимальное ожидание результата (секунды)
+"""
+
+import asyncio
+import base64
+import hashlib
+import hmac
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
+import bcrypt
+from django.conf import settings
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+
+class PasswordHashingUnavailable(APIException):
+    """Пул хеширования переполнен или не успел ответить."""
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = 'Сервис проверки паролей перегружен, повторите попытку позже'
+    default_code = 'password_hashing_unavailable'
+
+
+class BasePasswordHasher:
+    """
+    Базовый класс хешера.
+
+    cost — логарифмический параметр стоимости алгоритма; значение по
+    умолчанию берется из настройки cost_setting.
+    """
+    algorithm = None
+    cost_setting = None
+    default_cost = None
+    min_cost = None
+    max_cost = None
+
+    def __init__(self, cost=None):
+        self._cost = cost
+
+    @property
+    def cost(self) -> int:
+        if self._cost is None:
+            return getattr(settings, self.cost_setting, self.default_cost)
+        return self._cost
+
+    @classmethod
+    def identify(cls, encoded: str) -> bool:
+        """Создан ли хеш этим алгоритмом."""
+        raise NotImplementedError
+
+    def encode(self, password: str) -> str:
+        """Получить хеш пароля."""
+        raise NotImplementedError
+
+    def verify(self, password: str, encoded: str) -> bool:
+        """Проверить пароль против хеша."""
+        raise NotImplementedError
+
+    def must_update(self, encoded: str) -> bool:
+        """Отличаются ли параметры хеша от текущих настроек."""
+        return False
+
+
+class BCryptHasher(BasePasswordHasher):
+    """
+    bcrypt. Формат: $2b$<rounds>$<salt+hash>.
+    """
+    algorithm = 'bcrypt'
+    cost_setting = 'BCRYPT_ROUNDS'
+    default_cost = 12
+    min_cost = 4
+    max_cost = 31
+
+    @classmethod
+    def identify(cls, encoded: str) -> bool:
+        return encoded.startswith(('$2a$', '$2b$', '$2y$'))
+
+    def encode(self, password: str) -> str:
+        salt = bcrypt.gensalt(rounds=self.cost)
+        return bcrypt.hashpw(password.encode('utf-8'), salt).decode('utf-8')
+
+    def verify(self, password: str, encoded: str) -> bool:
+        return bcrypt.checkpw(password.encode('utf-8'), encoded.encode('utf-8'))
+
+    def must_update(self, encoded: str) -> bool:
+        return int(encoded.split('$')[2]) != self.cost
+
+
+class ScryptHasher(BasePasswordHasher):
+    """
+    scrypt из стандартной библиотеки (memory-hard).
+    Формат: scrypt$<log2 N>$<r>$<p>$<salt>$<hash>, salt и hash в base64.
+    """
+    algorithm = 'scrypt'
+    cost_setting = 'SCRYPT_COST'
+    default_cost = 14
+    min_cost = 10
+    max_cost = 20
+    block_size = 8
+    parallelism = 1
+
+    @classmethod
+    def identify(cls, encoded: str) -> bool:
+        return encoded.startswith('scrypt$')
+
+    def _derive(self, password: str, salt: bytes, cost: int, r: int, p: int) -> bytes:
+        n = 2 ** cost
+        return hashlib.scrypt(
+            password.encode('utf-8'),
+            salt=salt, n=n, r=r, p=p,
+            maxmem=256 * n * r * p,
+            dklen=64
+        )
+
+    def encode(self, password: str) -> str:
+        salt = os.urandom(16)
+        cost, r, p = self.cost, self.block_size, self.parallelism
+        derived = self._derive(password, salt, cost, r, p)
+        return '$'.join([
+            self.algorithm, str(cost), str(r), str(p),
+            base64.b64encode(salt).decode('ascii'),
+            base64.b64encode(derived).decode('ascii'),
+        ])
+
+    def verify(self, password: str, encoded: str) -> bool:
+        _, cost, r, p, salt, expected = encoded.split('$')
+        derived = self._derive(password, base64.b64decode(salt), int(cost), int(r), int(p))
+        return hmac.compare_digest(derived, base64.b64decode(expected))
+
+    def must_update(self, encoded: str) -> bool:
+        _, cost, r, p, _, _ = encoded.split('$')
+        return (int(cost), int(r), int(p)) != (self.cost, self.block_size, self.parallelism)
+
+
+HASHERS = {}
+
+
+def register_hasher(hasher_class):
+    """Зарегистрировать класс хешера по названию алгоритма."""
+    HASHERS[hasher_class.algorithm] = hasher_class
+    return hasher_class
+
+
+register_hasher(BCryptHasher)
+register_hasher(ScryptHasher)
+
+
+def get_hasher(algorithm: str = None, cost=None) -> BasePasswordHasher:
+    """
+    Получить хешер по названию алгоритма.
+
+    Args:
+        algorithm: название алгоритма (по умолчанию PASSWORD_HASHER)
+        cost: стоимость (по умолчанию из настроек)
+    """
+    algorithm = algorithm or getattr(settings, 'PASSWORD_HASHER', BCryptHasher.algorithm)
+    try:
+        return HASHERS[algorithm](cost)
+    except KeyError:
+        raise ValueError(f'Неизвестный алгоритм хеширования: {algorithm}')
+
+
+def identify_hasher(encoded: str) -> BasePasswordHasher:
+    """
+    Определить хешер по формату сохраненного хеша.
+
+    Raises:
+        ValueError: если формат не распознан
+    """
+    for hasher_class in HASHERS.values():
+        if hasher_class.identify(encoded):
+            return hasher_class()
+    raise ValueError('Неизвестный формат хеша пароля')
+
+
+def needs_rehash(encoded: str) -> bool:
+    """Нужно ли перехешировать пароль текущим алгоритмом и стоимостью."""
+    hasher = identify_hasher(encoded)
+    if hasher.algorithm != get_hasher().algorithm:
+        return True
+    return hasher.must_update(encoded)
+
+
+def _hash(password: str) -> str:
+    return get_hasher().encode(password)
+
+
+def _check(password: str, password_hash: str) -> bool:
+    return identify_hasher(password_hash).verify(password, password_hash)
+
+
+class PasswordHashingService:
+    """
+    Ограниченный пул потоков для хеширования с синхронным и асинхронным API.
+    """
+
+    def __init__(self, max_workers=None, queue_size=None, timeout=None):
+        self._max_workers = max_workers
+        self._queue_size = queue_size
+        self._timeout = timeout
+        self._executor = None
+        self._slots = None
+        self._lock = threading.Lock()
+        self.rejected = 0
+
+    @property
+    def max_workers(self) -> int:
+        return self._max_workers or getattr(settings, 'PASSWORD_HASHING_WORKERS', 4)
+
+    @property
+    def queue_size(self) -> int:
+        if self._queue_size is None:
+            return getattr(settings, 'PASSWORD_HASHING_QUEUE_SIZE', 16)
+        return self._queue_size
+
+    @property
+    def timeout(self) -> float:
+        return self._timeout or getattr(settings, 'PASSWORD_HASHING_TIMEOUT', 10)
+
+    def _ensure_executor(self):
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._slots = threading.BoundedSemaphore(self.max_workers + self.queue_size)
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.max_workers,
+                        thread_name_prefix='password-hashing'
+                    )
+        return self._executor
+
+    def _submit(self, fn, *args):
+        """
+        Поставить задачу в пул.
+
+        Raises:
+            PasswordHashingUnavailable: если все места в пуле и очереди заняты
+        """
+        executor = self._ensure_executor()
+        if not self._slots.acquire(blocking=False):
+            self.rejected += 1
+            raise PasswordHashingUnavailable()
+
+        try:
+            future = executor.submit(fn, *args)
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    def _wait(self, future):
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            raise PasswordHashingUnavailable()
+
+    def hash_password(self, password: str) -> str:
+        """Получить хеш пароля текущим алгоритмом."""
+        return self._wait(self._submit(_hash, password))
+
+    def check_password(self, password: str, password_hash: str) -> bool:
+        """Проверить пароль против хеша."""
+        return self._wait(self._submit(_check, password, password_hash))
+
+    async def ahash_password(self, password: str) -> str:
+        """Асинхронный вариант hash_password."""
+        future = asyncio.wrap_future(self._submit(_hash, password))
+        try:
+            return await asyncio.wait_for(future, self.timeout)
+        except asyncio.TimeoutError:
+            raise PasswordHashingUnavailable()
+
+    async def acheck_password(self, password: str, password_hash: str) -> bool:
+        """Асинхронный вариант check_password."""
+        future = asyncio.wrap_future(self._submit(_check, password, password_hash))
+        try:
+            return await asyncio.wait_for(future, self.timeout)
+        except asyncio.TimeoutError:
+            raise PasswordHashingUnavailable()
+
+
+password_hashing = PasswordHashingService()
@@ -24,7 +24,7 @@ class IsAdmin(BasePermission):
         if not request.user or not request.user.is_authenticated:
             return False
         
-        return request.user.roles.filter(name='Admin').exists()
+        return request.user.has_role('Admin')
 
 
 class HasAccessToElement(BasePermission):
@@ -66,7 +66,7 @@ class CanManageUsers(BasePermission):
             return False
 
         # Только Admin может управлять пользователями
-        return request.user.roles.filter(name='Admin').exists()
+        return request.user.has_role('Admin')
 
 
 class CanManageRoles(BasePermission):
@@ -79,7 +79,7 @@ class CanManageRoles(BasePermission):
             return False
 
         # Только Admin может управлять ролями
-        return request.user.roles.filter(name='Admin').exists()
+        return request.user.has_role('Admin')
 
 
 class CanViewOwnData(BasePermission):
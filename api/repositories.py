@@ -0,0 +1,295 @@
+"""
+Репозитории бизнес-объектов.
+
+Представления работают с данными только через интерфейс BaseRepository,
+поэтому хранилище можно заменить таблицей БД без изменения представлений.
+
+InMemoryRepository хранит записи в словаре по первичному ключу:
+- хеш-индексы (owner_id и др.) дают выборку по равенству за O(k);
+- сортированные индексы — списки (ключ, id), поддерживаемые через bisect, —
+  дают диапазоны, префиксы строк и упорядоченный обход с курсора без
+  сортировки всей коллекции.
+ID выдаются монотонно и не используются повторно.
+"""
+
+import threading
+from bisect import bisect_left, bisect_right, insort
+
+
+# Ключ, который больше любого ID (для верхней границы диапазона в индексе)
+_MAX_ID = float('inf')
+# Символ, который больше любого другого (для верхней границы префикса)
+_MAX_CHAR = '\U0010ffff'
+
+
+class BaseRepository:
+    """
+    Базовый класс репозитория записей-словарей с полями id и owner_id.
+    """
+
+    def get(self, pk):
+        """Получить запись по ID или None."""
+        raise NotImplementedError
+
+    def query(self, filters: dict = None, ordering: str = 'id', after=None, before=None, limit: int = None):
+        """
+        Отфильтрованная упорядоченная выборка с курсором.
+
+        Args:
+            filters: условия {поле: значение}, {поле__gte/__lte: значение},
+                {поле__startswith: префикс}
+            ordering: поле сортировки, '-' — по убыванию; при равенстве — по id
+            after: позиция (значение, id), после которой начинается выборка
+            before: позиция (значение, id), перед которой заканчивается выборка
+            limit: максимальное количество записей
+
+        Returns:
+            (записи в порядке ordering, есть ли еще записи за пределами limit)
+        """
+        raise NotImplementedError
+
+    def create(self, data: dict) -> dict:
+        """Создать запись с новым ID и вернуть ее."""
+        raise NotImplementedError
+
+    def update(self, pk, data: dict):
+        """Обновить поля записи и вернуть ее или None, если записи нет."""
+        raise NotImplementedError
+
+    def delete(self, pk) -> bool:
+        """Удалить запись. True, если запись существовала."""
+        raise NotImplementedError
+
+    def get_many(self, pks) -> dict:
+        """Записи по списку ID: {id: запись}, отсутствующие пропускаются."""
+        raise NotImplementedError
+
+    def bulk_create(self, items) -> list:
+        """Создать записи и вернуть их с новыми ID в том же порядке."""
+        raise NotImplementedError
+
+    def bulk_update(self, changes: dict) -> dict:
+        """Обновить записи {id: поля} и вернуть {id: запись} для существующих."""
+        raise NotImplementedError
+
+    def bulk_delete(self, pks) -> set:
+        """Удалить записи и вернуть множество удаленных ID."""
+        raise NotImplementedError
+
+
+def sort_key(value):
+    """Ключ сортированного индекса: строки сравниваются без учета регистра."""
+    return value.casefold() if isinstance(value, str) else value
+
+
+class InMemoryRepository(BaseRepository):
+    """
+    Репозиторий в памяти процесса.
+
+    Изменения выполняются под блокировкой. Наружу отдаются копии записей,
+    чтобы изменение результата не нарушало индексы.
+    """
+
+    def __init__(self, items=(), hash_fields=('owner_id',), sorted_fields=()):
+        self._lock = threading.RLock()
+        self._items = {}
+        self._hash = {field: {} for field in hash_fields}
+        self._sorted = {field: [] for field in ('id', *sorted_fields)}
+        self._next_id = 1
+        for item in items:
+            self._index(dict(item))
+            self._next_id = max(self._next_id, item['id'] + 1)
+
+    @property
+    def sorted_fields(self) -> tuple:
+        """Поля, по которым возможны сортировка, диапазоны и префиксы."""
+        return tuple(self._sorted)
+
+    def _index(self, item: dict):
+        self._items[item['id']] = item
+        self._index_fields(item)
+
+    def _unindex(self, item: dict):
+        self._unindex_fields(item)
+        del self._items[item['id']]
+
+    def _index_fields(self, item: dict):
+        pk = item['id']
+        for field, index in self._hash.items():
+            index.setdefault(item[field], {})[pk] = item
+        for field, index in self._sorted.items():
+            insort(index, (sort_key(item[field]), pk))
+
+    def _unindex_fields(self, item: dict):
+        pk = item['id']
+        for field, index in self._hash.items():
+            bucket = index.get(item[field])
+            if bucket is not None:
+                bucket.pop(pk, None)
+                if not bucket:
+                    del index[item[field]]
+        for field, index in self._sorted.items():
+            position = bisect_left(index, (sort_key(item[field]), pk))
+            del index[position]
+
+    def get(self, pk):
+        with self._lock:
+            item = self._items.get(pk)
+            return dict(item) if item is not None else None
+
+    def _parse_filters(self, filters: dict):
+        """
+        Разобрать условия на равенства, диапазоны сортированных полей и прочие проверки.
+
+        Returns:
+            (равенства {поле: значение}, диапазоны {поле: (нижний, верхний ключ)}, предикаты)
+        """
+        equals, bounds, predicates = {}, {}, []
+        for lookup, value in (filters or {}).items():
+            field, _, op = lookup.partition('__')
+            if op == '':
+                equals[field] = value
+                predicates.append(lambda item, f=field, v=value: item[f] == v)
+                continue
+
+            if op == 'gte':
+                low, high = (sort_key(value),), None
+                predicates.append(lambda item, f=field, v=value: item[f] >= v)
+            elif op == 'lte':
+                low, high = None, (sort_key(value), _MAX_ID)
+                predicates.append(lambda item, f=field, v=value: item[f] <= v)
+            elif op == 'startswith':
+                prefix = sort_key(value)
+                low, high = (prefix,), (prefix + _MAX_CHAR,)
+                predicates.append(lambda item, f=field, p=prefix: sort_key(item[f]).startswith(p))
+            else:
+                raise ValueError(f'Неизвестное условие: {lookup}')
+
+            if field in self._sorted:
+                current_low, current_high = bounds.get(field, (None, None))
+                bounds[field] = (
+                    max(filter(None, (current_low, low)), default=None),
+                    min(filter(None, (current_high, high)), default=None),
+                )
+        return equals, bounds, predicates
+
+    @staticmethod
+    def _walk(entries, low, high, forward: bool, cursor, items, predicates, limit):
+        """
+        Обойти отсортированный список (ключ, id) в пределах [low, high) от курсора.
+
+        Returns:
+            (подходящие записи в порядке обхода, есть ли еще)
+        """
+        if cursor is not None:
+            if forward:
+                low = max(low, bisect_right(entries, cursor))
+            else:
+                high = min(high, bisect_left(entries, cursor))
+        positions = range(low, high) if forward else range(high - 1, low - 1, -1)
+
+        result = []
+        for position in positions:
+            item = items[entries[position][1]]
+            if all(predicate(item) for predicate in predicates):
+                result.append(item)
+                if limit is not None and len(result) > limit:
+                    return result[:limit], True
+        return result, False
+
+    def query(self, filters: dict = None, ordering: str = 'id', after=None, before=None, limit: int = None):
+        descending = ordering.startswith('-')
+        field = ordering.lstrip('-')
+        if field not in self._sorted:
+            raise ValueError(f'Сортировка по полю {field} не поддерживается')
+
+        cursor = after if after is not None else before
+        if cursor is not None:
+            cursor = (sort_key(cursor[0]), cursor[1])
+        # Порядок обхода индекса: before читает записи перед курсором в обратную сторону
+        forward = descending == (before is not None)
+
+        equals, bounds, predicates = self._parse_filters(filters)
+
+        with self._lock:
+            # Самый узкий источник кандидатов: хеш-индекс или диапазон сортированного индекса
+            sources = []
+            for name, value in equals.items():
+                if name in self._hash:
+                    bucket = self._hash[name].get(value, {})
+                    sources.append((len(bucket), name, bucket))
+            for name, (low, high) in bounds.items():
+                index = self._sorted[name]
+                start = bisect_left(index, low) if low is not None else 0
+                end = bisect_left(index, high) if high is not None else len(index)
+                sources.append((max(0, end - start), name, (start, end)))
+            best = min(sources, key=lambda source: source[0], default=None)
+
+            if best is None or (best[1] == field and isinstance(best[2], tuple)):
+                # Упорядоченный обход индекса поля сортировки
+                entries = self._sorted[field]
+                low, high = best[2] if best is not None else (0, len(entries))
+            else:
+                if isinstance(best[2], tuple):
+                    start, end = best[2]
+                    candidates = (pk for _, pk in self._sorted[best[1]][start:end])
+                else:
+                    candidates = best[2]
+                entries = sorted((sort_key(self._items[pk][field]), pk) for pk in candidates)
+                low, high = 0, len(entries)
+
+            result, has_more = self._walk(
+                entries, low, high, forward, cursor, self._items, predicates, limit
+            )
+            result = [dict(item) for item in result]
+
+        if before is not None:
+            result.reverse()
+        return result, has_more
+
+    def create(self, data: dict) -> dict:
+        with self._lock:
+            item = dict(data, id=self._next_id)
+            self._next_id += 1
+            self._index(item)
+            return dict(item)
+
+    def update(self, pk, data: dict):
+        with self._lock:
+            item = self._items.get(pk)
+            if item is None:
+                return None
+            # Запись остается в _items: перестраиваются только вторичные индексы
+            self._unindex_fields(item)
+            item.update({key: value for key, value in data.items() if key != 'id'})
+            self._index_fields(item)
+            return dict(item)
+
+    def delete(self, pk) -> bool:
+        with self._lock:
+            item = self._items.get(pk)
+            if item is None:
+                return False
+            self._unindex(item)
+            return True
+
+    def get_many(self, pks) -> dict:
+        with self._lock:
+            return {pk: dict(self._items[pk]) for pk in pks if pk in self._items}
+
+    def bulk_create(self, items) -> list:
+        with self._lock:
+            return [self.create(data) for data in items]
+
+    def bulk_update(self, changes: dict) -> dict:
+        with self._lock:
+            updated = {}
+            for pk, data in changes.items():
+                item = self.update(pk, data)
+                if item is not None:
+                    updated[pk] = item
+            return updated
+
+    def bulk_delete(self, pks) -> set:
+        with self._lock:
+            return {pk for pk in pks if self.delete(pk)}
@@ -0,0 +1,153 @@
+"""
+Массовое назначение и снятие ролей.
+
+Пачка пар (user_id, role_id) обрабатывается фиксированным числом запросов
+независимо от размера: по одному запросу на проверку пользователей и ролей,
+один на уже существующие связи и один INSERT или DELETE (на SQLite —
+пачками по пределу числа параметров). Сигналы UserRole
+при этом не срабатывают, поэтому версии ролей затронутых пользователей
+увеличиваются один раз на всю пачку.
+"""
+
+from django.db import connection, transaction
+
+from .access_matrix import access_matrix
+from .models import User, Role, UserRole
+
+
+ASSIGNED = 'assigned'
+ALREADY_ASSIGNED = 'already_assigned'
+REMOVED = 'removed'
+NOT_ASSIGNED = 'not_assigned'
+USER_NOT_FOUND = 'user_not_found'
+ROLE_NOT_FOUND = 'role_not_found'
+
+
+def _delete_user_roles(ids):
+    """
+    Удалить связи UserRole по ID явным DELETE.
+
+    На UserRole никто не ссылается, поэтому сборщик каскадов и сигналы
+    post_delete на каждую строку не нужны. ID передаются пачками по пределу
+    параметров в запросе для текущей БД (для PostgreSQL — один запрос).
+    """
+    table = connection.ops.quote_name(UserRole._meta.db_table)
+    pk_field = UserRole._meta.pk
+    column = connection.ops.quote_name(pk_field.column)
+    values = [pk_field.get_db_prep_value(pk, connection) for pk in ids]
+    batch_size = max(connection.ops.bulk_batch_size([pk_field], values), 1)
+
+    with connection.cursor() as cursor:
+        for start in range(0, len(values), batch_size):
+            batch = values[start:start + batch_size]
+            placeholders = ', '.join(['%s'] * len(batch))
+            cursor.execute(f'DELETE FROM {table} WHERE {column} IN ({placeholders})', batch)
+
+
+def _resolve(pairs):
+    """
+    Проверить существование пользователей и ролей и найти уже существующие связи.
+
+    Returns:
+        (существующие user_id, существующие role_id, {(user_id, role_id): id связи})
+    """
+    user_ids = set(User.objects.filter(id__in={user_id for user_id, _ in pairs}).values_list('id', flat=True))
+    role_ids = set(Role.objects.filter(id__in={role_id for _, role_id in pairs}).values_list('id', flat=True))
+
+    existing = {}
+    if user_ids and role_ids:
+        rows = UserRole.objects.filter(
+            user_id__in=user_ids, role_id__in=role_ids
+        ).values_list('id', 'user_id', 'role_id')
+        existing = {(user_id, role_id): pk for pk, user_id, role_id in rows}
+    return user_ids, role_ids, existing
+
+
+def _outcome(pair, user_ids, role_ids):
+    user_id, role_id = pair
+    if user_id not in user_ids:
+        return USER_NOT_FOUND
+    if role_id not in role_ids:
+        return ROLE_NOT_FOUND
+    return None
+
+
+def _results(pairs, outcomes):
+    results = [
+        {'user_id': user_id, 'role_id': role_id, 'status': outcomes[(user_id, role_id)]}
+        for user_id, role_id in pairs
+    ]
+    summary = {}
+    for result in results:
+        summary[result['status']] = summary.get(result['status'], 0) + 1
+    return {'results': results, 'summary': summary}
+
+
+def bulk_assign_roles(pairs) -> dict:
+    """
+    Назначить роли пользователям.
+
+    Args:
+        pairs: список пар (user_id, role_id) в виде UUID
+
+    Returns:
+        {'results': [{'user_id', 'role_id', 'status'}], 'summary': {status: количество}}
+    """
+    unique_pairs = list(dict.fromkeys(pairs))
+
+    with transaction.atomic():
+        user_ids, role_ids, existing = _resolve(unique_pairs)
+
+        outcomes = {}
+        to_create = []
+        for pair in unique_pairs:
+            outcome = _outcome(pair, user_ids, role_ids)
+            if outcome is None:
+                if pair in existing:
+                    outcome = ALREADY_ASSIGNED
+                else:
+                    outcome = ASSIGNED
+                    to_create.append(UserRole(user_id=pair[0], role_id=pair[1]))
+            outcomes[pair] = outcome
+
+        # Связь, созданная параллельным запросом, пропускается уникальным индексом
+        UserRole.objects.bulk_create(to_create, ignore_conflicts=True)
+
+    access_matrix.bump_user_versions({user_role.user_id for user_role in to_create})
+    return _results(pairs, outcomes)
+
+
+def bulk_remove_roles(pairs) -> dict:
+    """
+    Снять роли с пользователей.
+
+    Args:
+        pairs: список пар (user_id, role_id) в виде UUID
+
+    Returns:
+        {'results': [{'user_id', 'role_id', 'status'}], 'summary': {status: количество}}
+    """
+    unique_pairs = list(dict.fromkeys(pairs))
+
+    with transaction.atomic():
+        user_ids, role_ids, existing = _resolve(unique_pairs)
+
+        outcomes = {}
+        to_delete = []
+        affected_users = set()
+        for pair in unique_pairs:
+            outcome = _outcome(pair, user_ids, role_ids)
+            if outcome is None:
+                if pair in existing:
+                    outcome = REMOVED
+                    to_delete.append(existing[pair])
+                    affected_users.add(pair[0])
+                else:
+                    outcome = NOT_ASSIGNED
+            outcomes[pair] = outcome
+
+        if to_delete:
+            _delete_user_roles(to_delete)
+
+    access_matrix.bump_user_versions(affected_users)
+    return _results(pairs, outcomes)
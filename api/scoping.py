@@ -0,0 +1,78 @@
+"""
+Ограничение выборок строками, доступными пользователю.
+
+RowScope строится по эффективным правам read / read_all на бизнес-объект
+(см. api/access_matrix.py) и применяется на стороне источника данных:
+в репозиториях (api/repositories.py) — условием по хеш-индексу owner_id.
+Недоступные строки не загружаются и не сериализуются.
+"""
+
+from .access_matrix import access_matrix, allows, READ, READ_ALL
+
+
+class RowScope:
+    """
+    Область видимости строк бизнес-объекта для пользователя.
+
+    Attributes:
+        can_read: есть право хотя бы на свои строки
+        can_read_all: есть право на все строки
+    """
+
+    def __init__(self, user_id, mask: int):
+        self.user_id = str(user_id) if user_id is not None else None
+        self.mask = mask
+        self.can_read_all = bool(mask & READ_ALL)
+        self.can_read = self.can_read_all or bool(mask & READ)
+
+    @classmethod
+    def for_user(cls, user, element_name: str) -> 'RowScope':
+        """
+        Область видимости по ролям пользователя.
+
+        Args:
+            user: User или TokenUser
+            element_name: название бизнес-объекта
+        """
+        if not user or not user.is_active:
+            return cls(None, 0)
+        return cls(user.id, access_matrix.mask_for(user.role_ids, element_name))
+
+    def allows(self, owner_id) -> bool:
+        """Видна ли строка с таким владельцем."""
+        if self.can_read_all:
+            return True
+        return self.can_read and str(owner_id) == self.user_id
+
+    def can(self, action: str, owner_id=None) -> bool:
+        """
+        Разрешено ли действие со строкой (без повторной загрузки ролей и правил).
+
+        Args:
+            action: действие (read, create, update, delete)
+            owner_id: владелец строки (для own-прав)
+        """
+        is_owner = owner_id is not None and str(owner_id) == self.user_id
+        return allows(self.mask, action, is_owner)
+
+    def repository_filters(self, filters: dict = None, owner_id=None):
+        """
+        Добавить к условиям выборки из репозитория ограничение по владельцу.
+
+        Args:
+            filters: условия выборки (см. BaseRepository.query)
+            owner_id: владелец, запрошенный клиентом (может только сузить выборку)
+
+        Returns:
+            условия или None, если выборка заведомо пуста
+        """
+        filters = dict(filters or {})
+        if self.can_read_all:
+            if owner_id:
+                filters['owner_id'] = str(owner_id)
+            return filters
+        if not self.can_read or (owner_id and str(owner_id) != self.user_id):
+            return None
+        filters['owner_id'] = self.user_id
+        return filters
+
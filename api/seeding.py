@@ -0,0 +1,172 @@
+"""
+Генерация синтетических данных для нагрузочных замеров.
+
+Записи вставляются через bulk_create пачками; пароль хешируется один раз,
+и хеш используется для всех сгенерированных пользователей. Генератор
+случайных чисел передается явно, чтобы наборы данных были воспроизводимы.
+
+bulk_create не отправляет post_save, и матрица прав (api/access_matrix.py)
+не инвалидируется сигналами. После создания ролей, объектов и правил
+вызывающий код должен один раз выполнить access_matrix.bump_version().
+"""
+
+from itertools import accumulate, islice
+
+from django.db import transaction
+
+from .access_matrix import RULE_FIELDS
+from .models import User, Role, UserRole, BusinessElement, AccessRoleRule
+
+
+DEFAULT_BATCH_SIZE = 1000
+
+# Вероятность каждого права в сгенерированном правиле
+RULE_PROBABILITIES = {
+    'read_permission': 0.8,
+    'read_all_permission': 0.2,
+    'create_permission': 0.4,
+    'update_permission': 0.4,
+    'update_all_permission': 0.1,
+    'delete_permission': 0.2,
+    'delete_all_permission': 0.05,
+}
+
+
+def bulk_insert(model, objects, batch_size: int = DEFAULT_BATCH_SIZE, progress=None) -> int:
+    """
+    Вставить объекты пачками, не материализуя весь поток.
+
+    Args:
+        model: модель
+        objects: итерируемый поток несохраненных экземпляров
+        batch_size: размер пачки
+        progress: вызывается после каждой пачки с числом вставленных записей
+
+    Returns:
+        количество вставленных записей
+    """
+    objects = iter(objects)
+    inserted = 0
+    while True:
+        batch = list(islice(objects, batch_size))
+        if not batch:
+            return inserted
+        with transaction.atomic():
+            model.objects.bulk_create(batch, batch_size=batch_size)
+        inserted += len(batch)
+        if progress is not None:
+            progress(inserted)
+
+
+def seed_roles(count: int, prefix: str = 'Role') -> list:
+    """Создать роли {prefix}-1..N и вернуть их."""
+    roles = [Role(name=f'{prefix}-{index}', description='Синтетическая роль') for index in range(1, count + 1)]
+    Role.objects.bulk_create(roles, batch_size=DEFAULT_BATCH_SIZE)
+    return roles
+
+
+def seed_elements(count: int, prefix: str = 'element') -> list:
+    """Создать бизнес-объекты {prefix}-1..K и вернуть их."""
+    elements = [
+        BusinessElement(name=f'{prefix}-{index}', description='Синтетический бизнес-объект')
+        for index in range(1, count + 1)
+    ]
+    BusinessElement.objects.bulk_create(elements, batch_size=DEFAULT_BATCH_SIZE)
+    return elements
+
+
+def seed_rules(roles, elements, rng, density: float = 0.5, batch_size: int = DEFAULT_BATCH_SIZE) -> int:
+    """
+    Создать правила доступа для случайной доли пар роль × объект.
+
+    Вероятности прав — RULE_PROBABILITIES: чтение встречается чаще изменения,
+    права на "все" записи — реже прав на свои.
+
+    Args:
+        roles: роли
+        elements: бизнес-объекты
+        rng: random.Random
+        density: доля пар, для которых создается правило
+
+    Returns:
+        количество созданных правил
+    """
+    def rules():
+        for role in roles:
+            for element in elements:
+                if rng.random() >= density:
+                    continue
+                flags = {name: rng.random() < RULE_PROBABILITIES[name] for name, _ in RULE_FIELDS}
+                yield AccessRoleRule(role=role, element=element, **flags)
+
+    return bulk_insert(AccessRoleRule, rules(), batch_size)
+
+
+def geometric_role_count(max_roles: int, extra_probability: float = 0.3):
+    """
+    Распределение числа ролей: одна роль у большинства, каждая следующая —
+    с вероятностью extra_probability, но не больше max_roles.
+    """
+    def role_count(rng) -> int:
+        count = 1
+        while count < max_roles and rng.random() < extra_probability:
+            count += 1
+        return count
+    return role_count
+
+
+def seed_users(count: int, password_hash: str, roles, rng, roles_per_user=1,
+               email_prefix: str = 'user', batch_size: int = DEFAULT_BATCH_SIZE, progress=None) -> int:
+    """
+    Создать пользователей с одним общим хешем пароля и назначить им роли.
+
+    Роли выбираются с убывающей частотой: первая роль в списке самая частая,
+    как обычная пользовательская роль в реальных данных.
+
+    Args:
+        count: количество пользователей
+        password_hash: готовый хеш пароля
+        roles: роли для назначения
+        rng: random.Random
+        roles_per_user: ролей на пользователя (не больше числа ролей) или
+            функция rng -> количество, для разного числа ролей у пользователей
+        email_prefix: префикс email ({prefix}-{n}@seed.local)
+        batch_size: размер пачки
+        progress: вызывается после каждой пачки с числом созданных пользователей
+
+    Returns:
+        количество созданных пользователей
+    """
+    roles = list(roles)
+    if not callable(roles_per_user):
+        def roles_per_user(_rng, _count=roles_per_user):
+            return _count
+    indexes = range(len(roles))
+    cum_weights = list(accumulate(1 / (rank + 1) for rank in indexes))
+
+    created = 0
+    for start in range(0, count, batch_size):
+        users = [
+            User(
+                email=f'{email_prefix}-{index}@seed.local',
+                first_name='Имя',
+                last_name=f'Фамилия{index}',
+                password_hash=password_hash,
+            )
+            for index in range(start + 1, min(start + batch_size, count) + 1)
+        ]
+        assignments = []
+        for user in users:
+            chosen = set()
+            wanted = min(roles_per_user(rng), len(roles))
+            while len(chosen) < wanted:
+                chosen.add(rng.choices(indexes, cum_weights=cum_weights)[0])
+            assignments.extend(UserRole(user=user, role=roles[index]) for index in chosen)
+
+        with transaction.atomic():
+            User.objects.bulk_create(users)
+            UserRole.objects.bulk_create(assignments)
+        created += len(users)
+        if progress is not None:
+            progress(created)
+    return created
@@ -2,6 +2,7 @@
 Сериализаторы для API endpoints.
 """
 
+from django.conf import settings
 from rest_framework import serializers
 from .models import User, Role, UserRole, BusinessElement, AccessRoleRule, Session
 
@@ -72,6 +73,49 @@ class LoginSerializer(serializers.Serializer):
     password = serializers.CharField(write_only=True)
 
 
+class PermissionCheckSerializer(serializers.Serializer):
+    """Одна проверка права: бизнес-объект, действие и (опционально) владелец."""
+    element = serializers.CharField(max_length=100)
+    action = serializers.ChoiceField(choices=['read', 'create', 'update', 'delete'])
+    owner_id = serializers.UUIDField(required=False, allow_null=True)
+    key = serializers.CharField(required=False, max_length=200)
+
+    def to_internal_value(self, data):
+        data = super().to_internal_value(data)
+        if not data.get('key'):
+            data['key'] = f"{data['element']}:{data['action']}"
+            if data.get('owner_id'):
+                data['key'] += f":{data['owner_id']}"
+        return data
+
+
+class PermissionChecksSerializer(serializers.Serializer):
+    """Список проверок прав текущего пользователя."""
+    checks = serializers.ListField(
+        child=PermissionCheckSerializer(),
+        allow_empty=False,
+        max_length=getattr(settings, 'PERMISSION_CHECKS_MAX_ITEMS', 500)
+    )
+
+
+class RoleAssignmentSerializer(serializers.Serializer):
+    """Пара пользователь — роль для массового назначения или снятия."""
+    user_id = serializers.UUIDField()
+    role_id = serializers.UUIDField()
+
+
+class BulkRoleAssignmentSerializer(serializers.Serializer):
+    """Список пар пользователь — роль."""
+    assignments = serializers.ListField(
+        child=RoleAssignmentSerializer(),
+        allow_empty=False,
+        max_length=getattr(settings, 'BULK_ROLE_ASSIGNMENT_MAX_ITEMS', 10000)
+    )
+
+    def get_pairs(self):
+        return [(item['user_id'], item['role_id']) for item in self.validated_data['assignments']]
+
+
 class RoleSerializer(serializers.ModelSerializer):
     """Сериализатор для модели Role."""
     class Meta:
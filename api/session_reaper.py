@@ -0,0 +1,97 @@
+"""
+Удаление истекших сессий.
+
+Истекшие сессии удаляются лениво только при предъявлении cookie, поэтому
+брошенные сессии накапливаются. reap_expired_sessions удаляет их пачками
+через текущее хранилище сессий; вызывается командой reap_sessions или
+фоновым потоком процесса, если SESSION_REAPER_INTERVAL > 0.
+
+Поток запускается из WSGI-точки входа (config/wsgi.py), то есть только в
+процессах, обслуживающих запросы: manage.py migrate, test, shell и другие
+команды, а также родительский процесс автоперезагрузки runserver его не
+запускают.
+
+Настройки:
+- SESSION_REAPER_INTERVAL: период фонового удаления (секунды, 0 — выключено)
+- SESSION_REAPER_BATCH_SIZE: размер пачки
+- SESSION_REAPER_SLEEP: пауза между пачками (секунды)
+"""
+
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.db import DatabaseError, close_old_connections
+
+from .session_store import get_session_store
+
+
+logger = logging.getLogger(__name__)
+
+
+def reap_expired_sessions(batch_size: int = None, sleep: float = None) -> dict:
+    """
+    Удалить истекшие сессии.
+
+    Args:
+        batch_size: размер пачки (по умолчанию SESSION_REAPER_BATCH_SIZE)
+        sleep: пауза между пачками (по умолчанию SESSION_REAPER_SLEEP)
+
+    Returns:
+        {'deleted': количество удаленных сессий, 'duration': время в секундах}
+    """
+    if batch_size is None:
+        batch_size = getattr(settings, 'SESSION_REAPER_BATCH_SIZE', 1000)
+    if sleep is None:
+        sleep = getattr(settings, 'SESSION_REAPER_SLEEP', 0.1)
+
+    started = time.monotonic()
+    deleted = get_session_store().reap(batch_size=batch_size, sleep=sleep)
+    return {'deleted': deleted, 'duration': time.monotonic() - started}
+
+
+class SessionReaper(threading.Thread):
+    """
+    Фоновый поток, периодически удаляющий истекшие сессии.
+    """
+
+    def __init__(self, interval: float):
+        super().__init__(name='session-reaper', daemon=True)
+        self.interval = interval
+        self._stopped = threading.Event()
+
+    def run(self):
+        while not self._stopped.wait(self.interval):
+            try:
+                result = reap_expired_sessions()
+                if result['deleted']:
+                    logger.info(
+                        'Удалено истекших сессий: %d за %.2f с',
+                        result['deleted'], result['duration']
+                    )
+            except DatabaseError:
+                logger.exception('Не удалось удалить истекшие сессии')
+            finally:
+                close_old_connections()
+
+    def stop(self):
+        self._stopped.set()
+
+
+_reaper = None
+_reaper_lock = threading.Lock()
+
+
+def start_session_reaper():
+    """Запустить фоновый поток, если задан SESSION_REAPER_INTERVAL."""
+    global _reaper
+    interval = getattr(settings, 'SESSION_REAPER_INTERVAL', 0)
+    if interval <= 0:
+        return None
+
+    with _reaper_lock:
+        if _reaper is None:
+            _reaper = SessionReaper(interval)
+            _reaper.start()
+    return _reaper
@@ -0,0 +1,346 @@
+"""
+Хранилища сессий.
+
+SessionAuthentication, create_session и invalidate_session работают через
+хранилище, выбранное настройкой SESSION_STORE_BACKEND:
+- DatabaseSessionStore: таблица sessions (по умолчанию)
+- InMemorySessionStore: словарь в памяти процесса
+- FileSessionStore: файлы в каталоге, общем для воркеров одного хоста
+
+Параметры конструктора передаются через SESSION_STORE_OPTIONS.
+Все хранилища возвращают объекты Session; для хранилищ вне БД это
+несохраненные экземпляры, а session.user загружается по user_id.
+"""
+
+import json
+import os
+import tempfile
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .activity import activity_tracker
+from .models import Session
+
+
+SESSION_LIFETIME = timedelta(hours=24)
+
+
+class BaseSessionStore:
+    """
+    Базовый класс хранилища сессий.
+    """
+
+    def create(self, user, ip_address: str, user_agent: str = '') -> Session:
+        """Создать сессию пользователя."""
+        raise NotImplementedError
+
+    def get(self, session_key: str):
+        """Получить сессию по ключу или None."""
+        raise NotImplementedError
+
+    def delete(self, session_key: str) -> bool:
+        """Удалить сессию. True, если сессия существовала."""
+        raise NotImplementedError
+
+    def delete_for_user(self, user_id) -> int:
+        """Удалить все сессии пользователя и вернуть их количество."""
+        raise NotImplementedError
+
+    def touch(self, session: Session):
+        """Отметить активность сессии (не чаще SESSION_ACTIVITY_MIN_AGE)."""
+
+    def reap(self, batch_size: int = 1000, sleep: float = 0.0) -> int:
+        """
+        Удалить истекшие сессии пачками.
+
+        Args:
+            batch_size: размер пачки
+            sleep: пауза между пачками (секунды)
+
+        Returns:
+            количество удаленных сессий
+        """
+        raise NotImplementedError
+
+    @staticmethod
+    def _new_session(user, ip_address: str, user_agent: str) -> Session:
+        now = timezone.now()
+        return Session(
+            user=user,
+            session_key=str(uuid.uuid4()),
+            ip_address=ip_address,
+            user_agent=user_agent,
+            created_at=now,
+            expires_at=now + SESSION_LIFETIME,
+            last_activity=now,
+        )
+
+
+class DatabaseSessionStore(BaseSessionStore):
+    """
+    Сессии в таблице sessions.
+    """
+
+    def create(self, user, ip_address: str, user_agent: str = '') -> Session:
+        return Session.objects.create(
+            user=user,
+            session_key=str(uuid.uuid4()),
+            ip_address=ip_address,
+            user_agent=user_agent,
+            expires_at=timezone.now() + SESSION_LIFETIME
+        )
+
+    def get(self, session_key: str):
+        try:
+            return Session.objects.select_related('user').get(session_key=session_key)
+        except Session.DoesNotExist:
+            return None
+
+    def delete(self, session_key: str) -> bool:
+        deleted, _ = Session.objects.filter(session_key=session_key).delete()
+        return deleted > 0
+
+    def delete_for_user(self, user_id) -> int:
+        deleted, _ = Session.objects.filter(user_id=user_id).delete()
+        return deleted
+
+    def touch(self, session: Session):
+        # Запись откладывается и выполняется пачкой
+        activity_tracker.touch(session.session_key, session.last_activity)
+
+    def reap(self, batch_size: int = 1000, sleep: float = 0.0) -> int:
+        # Пачки выбираются по индексу expires_at, каждая удаляется отдельным
+        # коротким DELETE, чтобы не держать блокировки на всей таблице
+        deleted = 0
+        while True:
+            ids = list(
+                Session.objects.filter(expires_at__lte=timezone.now())
+                .order_by('expires_at')
+                .values_list('id', flat=True)[:batch_size]
+            )
+            if not ids:
+                break
+            count, _ = Session.objects.filter(id__in=ids).delete()
+            deleted += count
+            if len(ids) < batch_size:
+                break
+            if sleep:
+                time.sleep(sleep)
+        return deleted
+
+
+def _to_record(session: Session) -> dict:
+    return {
+        'id': str(session.id),
+        'user_id': str(session.user_id),
+        'session_key': session.session_key,
+        'ip_address': session.ip_address,
+        'user_agent': session.user_agent,
+        'created_at': session.created_at.isoformat(),
+        'expires_at': session.expires_at.isoformat(),
+        'last_activity': session.last_activity.isoformat(),
+    }
+
+
+def _from_record(record: dict) -> Session:
+    return Session(
+        id=uuid.UUID(record['id']),
+        user_id=uuid.UUID(record['user_id']),
+        session_key=record['session_key'],
+        ip_address=record['ip_address'],
+        user_agent=record['user_agent'],
+        created_at=datetime.fromisoformat(record['created_at']),
+        expires_at=datetime.fromisoformat(record['expires_at']),
+        last_activity=datetime.fromisoformat(record['last_activity']),
+    )
+
+
+class InMemorySessionStore(BaseSessionStore):
+    """
+    Сессии в памяти процесса. Подходит для одного воркера или
+    для sticky-сессий на балансировщике; при перезапуске сессии теряются.
+    """
+
+    def __init__(self):
+        self._records = {}
+        self._lock = threading.Lock()
+
+    def create(self, user, ip_address: str, user_agent: str = '') -> Session:
+        session = self._new_session(user, ip_address, user_agent)
+        with self._lock:
+            self._records[session.session_key] = _to_record(session)
+        return session
+
+    def get(self, session_key: str):
+        with self._lock:
+            record = self._records.get(session_key)
+        return _from_record(record) if record else None
+
+    def delete(self, session_key: str) -> bool:
+        with self._lock:
+            return self._records.pop(session_key, None) is not None
+
+    def delete_for_user(self, user_id) -> int:
+        user_id = str(user_id)
+        with self._lock:
+            keys = [key for key, record in self._records.items() if record['user_id'] == user_id]
+            for key in keys:
+                del self._records[key]
+        return len(keys)
+
+    def touch(self, session: Session):
+        now = timezone.now()
+        if activity_tracker.is_stale(session.last_activity, now):
+            with self._lock:
+                record = self._records.get(session.session_key)
+                if record:
+                    record['last_activity'] = now.isoformat()
+
+    def reap(self, batch_size: int = 1000, sleep: float = 0.0) -> int:
+        now = timezone.now()
+        with self._lock:
+            keys = [
+                key for key, record in self._records.items()
+                if datetime.fromisoformat(record['expires_at']) <= now
+            ]
+            for key in keys:
+                del self._records[key]
+        return len(keys)
+
+
+class FileSessionStore(BaseSessionStore):
+    """
+    Сессии в JSON-файлах (один файл на сессию) в каталоге path
+    (по умолчанию SESSION_STORE_PATH). Каталог общий для всех воркеров
+    хоста; запись атомарна (os.replace).
+
+    Активность отмечается временем изменения файла (os.utime), а не
+    перезаписью: удаленная между get() и touch() сессия не восстанавливается.
+    """
+
+    def __init__(self, path=None):
+        path = path or getattr(settings, 'SESSION_STORE_PATH', '')
+        self.path = str(path or os.path.join(tempfile.gettempdir(), 'api_sessions'))
+        os.makedirs(self.path, exist_ok=True)
+
+    def _file(self, session_key: str):
+        # Ключ — UUID; все остальное отбрасывается, чтобы не выйти за пределы каталога
+        try:
+            return os.path.join(self.path, str(uuid.UUID(session_key)) + '.json')
+        except (ValueError, TypeError, AttributeError):
+            return None
+
+    def _read(self, filename: str):
+        try:
+            with open(filename, encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _read_session(self, filename: str):
+        """Сессия из файла; last_activity — не раньше времени изменения файла."""
+        try:
+            with open(filename, encoding='utf-8') as f:
+                record = json.load(f)
+                modified = os.fstat(f.fileno()).st_mtime
+        except (OSError, ValueError):
+            return None
+        session = _from_record(record)
+        session.last_activity = max(
+            session.last_activity, datetime.fromtimestamp(modified, tz=dt_timezone.utc)
+        )
+        return session
+
+    def _write(self, session: Session):
+        fd, tmp_name = tempfile.mkstemp(dir=self.path, suffix='.tmp')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(_to_record(session), f)
+        os.replace(tmp_name, self._file(session.session_key))
+
+    def create(self, user, ip_address: str, user_agent: str = '') -> Session:
+        session = self._new_session(user, ip_address, user_agent)
+        self._write(session)
+        return session
+
+    def get(self, session_key: str):
+        filename = self._file(session_key)
+        return self._read_session(filename) if filename else None
+
+    def delete(self, session_key: str) -> bool:
+        filename = self._file(session_key)
+        if not filename:
+            return False
+        try:
+            os.remove(filename)
+            return True
+        except FileNotFoundError:
+            return False
+
+    def delete_for_user(self, user_id) -> int:
+        user_id = str(user_id)
+        deleted = 0
+        for entry in os.scandir(self.path):
+            if not entry.name.endswith('.json'):
+                continue
+            record = self._read(entry.path)
+            if record and record['user_id'] == user_id:
+                try:
+                    os.remove(entry.path)
+                    deleted += 1
+                except FileNotFoundError:
+                    pass
+        return deleted
+
+    def touch(self, session: Session):
+        now = timezone.now()
+        if activity_tracker.is_stale(session.last_activity, now):
+            filename = self._file(session.session_key)
+            if not filename:
+                return
+            try:
+                # utime не создает файл: удаленная сессия остается удаленной
+                os.utime(filename, (now.timestamp(), now.timestamp()))
+            except FileNotFoundError:
+                return
+            session.last_activity = now
+
+    def reap(self, batch_size: int = 1000, sleep: float = 0.0) -> int:
+        now = timezone.now()
+        deleted = 0
+        checked = 0
+        for entry in os.scandir(self.path):
+            if not entry.name.endswith('.json'):
+                continue
+            record = self._read(entry.path)
+            if record and datetime.fromisoformat(record['expires_at']) <= now:
+                try:
+                    os.remove(entry.path)
+                    deleted += 1
+                except FileNotFoundError:
+                    pass
+            checked += 1
+            if sleep and checked % batch_size == 0:
+                time.sleep(sleep)
+        return deleted
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_session_store() -> BaseSessionStore:
+    """Хранилище сессий из настроек (создается один раз на процесс)."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                backend = getattr(settings, 'SESSION_STORE_BACKEND', 'api.session_store.DatabaseSessionStore')
+                options = getattr(settings, 'SESSION_STORE_OPTIONS', {})
+                _store = import_string(backend)(**options)
+    return _store
@@ -0,0 +1,51 @@
+"""
+Обработчики сигналов моделей.
+
+Подключаются в ApiConfig.ready().
+
+Версии матрицы прав поднимаются после фиксации транзакции (on_commit):
+иначе другой воркер может увидеть новую версию, перестроить матрицу по
+еще не зафиксированным данным и закешировать устаревший снимок до TTL.
+"""
+
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .access_matrix import access_matrix
+from .models import User, Role, UserRole, BusinessElement, AccessRoleRule
+from .session_store import get_session_store
+
+
+@receiver(post_save, sender=Role)
+@receiver(post_delete, sender=Role)
+@receiver(post_save, sender=BusinessElement)
+@receiver(post_delete, sender=BusinessElement)
+@receiver(post_save, sender=AccessRoleRule)
+@receiver(post_delete, sender=AccessRoleRule)
+def invalidate_access_matrix(sender, **kwargs):
+    """Перестроить матрицу прав при изменении ролей, объектов или правил."""
+    transaction.on_commit(access_matrix.bump_version)
+
+
+@receiver(post_save, sender=UserRole)
+@receiver(post_delete, sender=UserRole)
+def invalidate_user_roles(sender, instance, **kwargs):
+    """Сделать устаревшими токены с ролями пользователя при изменении его ролей."""
+    transaction.on_commit(partial(access_matrix.bump_user_version, instance.user_id))
+
+
+@receiver(post_save, sender=User)
+def invalidate_inactive_user(sender, instance, **kwargs):
+    """Деактивированный пользователь не должен проходить по claims токена."""
+    if not instance.is_active:
+        transaction.on_commit(partial(access_matrix.bump_user_version, instance.id))
+
+
+@receiver(post_delete, sender=User)
+def invalidate_deleted_user(sender, instance, **kwargs):
+    """Удаленный пользователь не должен проходить по claims токена и cookie сессии."""
+    transaction.on_commit(partial(access_matrix.bump_user_version, instance.id))
+    get_session_store().delete_for_user(instance.id)
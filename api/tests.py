@@ -0,0 +1,165 @@
+"""
+Регрессионные тесты числа запросов к БД и хранилищ сессий.
+
+Запуск без Postgres:
+    DB_ENGINE=django.db.backends.sqlite3 python manage.py test api
+"""
+
+import os
+import random
+import tempfile
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import SimpleTestCase, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from .access_matrix import access_matrix
+from .authentication import generate_jwt_token, create_session
+from .metrics import permission_checks
+from .models import User, Role, UserRole
+from .seeding import seed_roles, seed_users
+from .session_store import FileSessionStore
+
+
+# Хеш не проверяется: пользователи аутентифицируются JWT
+PASSWORD_HASH = 'unused'
+
+
+class UserListQueriesTest(TestCase):
+    """Список пользователей читает роли из prefetch, а не по запросу на пользователя."""
+
+    @classmethod
+    def setUpTestData(cls):
+        admin_role = Role.objects.create(name='Admin')
+        cls.admin = User.objects.create(
+            email='admin@example.com', first_name='Админ', last_name='Тестов', password_hash=PASSWORD_HASH
+        )
+        UserRole.objects.create(user=cls.admin, role=admin_role)
+        roles = seed_roles(5, prefix='TestRole')
+        seed_users(60, PASSWORD_HASH, roles, random.Random(0), roles_per_user=3, email_prefix='test')
+
+    def setUp(self):
+        cache.clear()
+        self.auth = {'HTTP_AUTHORIZATION': f'Bearer {generate_jwt_token(self.admin.id)}'}
+        # Матрица прав строится один раз на процесс и не относится к запросу
+        access_matrix.masks_for([])
+
+    def test_query_count_does_not_grow_with_page_size(self):
+        for page_size in (5, 20, 50):
+            with self.subTest(page_size=page_size), self.assertNumQueries(4):
+                response = self.client.get(f'/api/users/?page_size={page_size}', **self.auth)
+            self.assertEqual(response.status_code, 200)
+            results = response.json()['results']
+            self.assertEqual(len(results), page_size)
+            self.assertTrue(all(user['roles'] for user in results))
+
+    def test_detail_query_count(self):
+        user = User.objects.filter(email__startswith='test-').first()
+        with self.assertNumQueries(4):
+            response = self.client.get(f'/api/users/{user.id}/', **self.auth)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['roles']), 3)
+
+
+class AuthenticationQueriesTest(TestCase):
+    """Пользователь загружается один раз за запрос: middleware и DRF делят результат."""
+
+    @classmethod
+    def setUpTestData(cls):
+        role = Role.objects.create(name='User')
+        cls.user = User.objects.create(
+            email='user@example.com', first_name='Иван', last_name='Тестов', password_hash=PASSWORD_HASH
+        )
+        UserRole.objects.create(user=cls.user, role=role)
+
+    def setUp(self):
+        cache.clear()
+        access_matrix.masks_for([])
+
+    def _user_lookups(self, **headers) -> int:
+        """Число SELECT, читающих таблицу users (в том числе через JOIN)."""
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.get('/api/auth/me/', **headers)
+        self.assertEqual(response.status_code, 200)
+        return sum(1 for query in captured if query['sql'].lstrip().upper().startswith('SELECT') and
+                   '"users"' in query['sql'])
+
+    def test_jwt_request_loads_user_once(self):
+        token = generate_jwt_token(self.user.id)
+        self.assertEqual(self._user_lookups(HTTP_AUTHORIZATION=f'Bearer {token}'), 1)
+
+    def test_session_request_loads_user_once(self):
+        session = create_session(self.user, '127.0.0.1')
+        self.client.cookies['session_id'] = session.session_key
+        self.assertEqual(self._user_lookups(), 1)
+
+
+class PermissionCheckMetricsTest(TestCase):
+    """Пакетная проверка прав учитывается в метрике по одной на проверку."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(
+            email='user@example.com', first_name='Иван', last_name='Тестов', password_hash=PASSWORD_HASH
+        )
+
+    @staticmethod
+    def _total() -> float:
+        return sum(permission_checks.dump().values())
+
+    def test_batch_check_increments_counter_per_check(self):
+        checks = [{'element': 'products', 'action': action} for action in ('read', 'create', 'update')]
+        before = self._total()
+        response = self.client.post(
+            '/api/auth/check_permissions/', {'checks': checks}, content_type='application/json',
+            HTTP_AUTHORIZATION=f'Bearer {generate_jwt_token(self.user.id)}'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self._total() - before, len(checks))
+
+
+class AccessMatrixInvalidationTest(TestCase):
+    """Версия матрицы прав поднимается только после фиксации транзакции."""
+
+    def test_bump_waits_for_commit(self):
+        before = access_matrix.version
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            Role.objects.create(name='Auditor')
+            self.assertEqual(access_matrix.version, before)
+        self.assertEqual(len(callbacks), 1)
+        self.assertNotEqual(access_matrix.version, before)
+
+
+class FileSessionStoreTest(SimpleTestCase):
+    """Отметка активности не восстанавливает удаленную сессию."""
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.store = FileSessionStore(path=directory.name)
+        self.user = User(email='user@example.com')
+
+    def _stale(self, session):
+        session.last_activity = timezone.now() - timedelta(days=1)
+        return session
+
+    def test_touch_after_delete_does_not_restore_session(self):
+        session_key = self.store.create(self.user, '127.0.0.1').session_key
+        session = self._stale(self.store.get(session_key))
+        self.assertTrue(self.store.delete(session_key))
+        self.store.touch(session)
+        self.assertIsNone(self.store.get(session_key))
+
+    def test_touch_updates_last_activity(self):
+        session = self._stale(self.store.create(self.user, '127.0.0.1'))
+        self.store._write(session)
+        stale = session.last_activity.timestamp()
+        os.utime(self.store._file(session.session_key), (stale, stale))
+
+        session = self.store.get(session.session_key)
+        self.assertEqual(session.last_activity.timestamp(), stale)
+        self.store.touch(session)
+        self.assertGreater(self.store.get(session.session_key).last_activity, timezone.now() - timedelta(minutes=1))
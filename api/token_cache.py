@@ -0,0 +1,144 @@
+"""
+Кеш проверенных JWT токенов.
+
+Клиенты отправляют один и тот же токен тысячи раз за время его жизни,
+поэтому результат jwt.decode кешируется по SHA-256 дайджесту токена.
+Кеш ограничен по размеру (LRU), записи удаляются по истечении exp токена.
+Кеш локален для процесса; размер задается JWT_TOKEN_CACHE_SIZE (0 — выключен).
+"""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+
+
+class VerifiedTokenCache:
+    """
+    LRU-кеш {дайджест токена: (payload, user_id, exp)} со счетчиками.
+    """
+
+    def __init__(self, max_size=None):
+        self._max_size = max_size
+        self._entries = OrderedDict()
+        self._by_user = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @property
+    def max_size(self) -> int:
+        if self._max_size is None:
+            return getattr(settings, 'JWT_TOKEN_CACHE_SIZE', 0)
+        return self._max_size
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_size > 0
+
+    @staticmethod
+    def digest(token: str) -> str:
+        """Ключ кеша для токена."""
+        return hashlib.sha256(token.encode('utf-8')).hexdigest()
+
+    def get(self, token: str):
+        """
+        Получить payload проверенного токена.
+
+        Returns:
+            payload или None, если токена нет в кеше или он истек
+        """
+        if not self.enabled:
+            return None
+
+        key = self.digest(token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            payload, user_id, exp = entry
+            if exp is not None and exp <= time.time():
+                self._remove(key, user_id)
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return payload
+
+    def put(self, token: str, payload: dict):
+        """Сохранить payload успешно проверенного токена."""
+        if not self.enabled:
+            return
+
+        key = self.digest(token)
+        user_id = str(payload.get('user_id'))
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return
+
+            self._entries[key] = (payload, user_id, payload.get('exp'))
+            self._by_user.setdefault(user_id, set()).add(key)
+
+            while len(self._entries) > self.max_size:
+                old_key, (_, old_user_id, _) = self._entries.popitem(last=False)
+                self._discard_user_key(old_key, old_user_id)
+                self.evictions += 1
+
+    def evict_user(self, user_id) -> int:
+        """
+        Удалить все токены пользователя (logout, деактивация).
+
+        Returns:
+            количество удаленных записей
+        """
+        user_id = str(user_id)
+        with self._lock:
+            keys = self._by_user.pop(user_id, set())
+            for key in keys:
+                self._entries.pop(key, None)
+            return len(keys)
+
+    def clear(self):
+        """Очистить кеш и счетчики."""
+        with self._lock:
+            self._entries.clear()
+            self._by_user.clear()
+            self.hits = self.misses = self.evictions = self.expirations = 0
+
+    def stats(self) -> dict:
+        """Счетчики для подбора размера кеша."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'enabled': self.enabled,
+                'max_size': self.max_size,
+                'size': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'hit_ratio': self.hits / lookups if lookups else 0.0,
+            }
+
+    def _remove(self, key, user_id):
+        self._entries.pop(key, None)
+        self._discard_user_key(key, user_id)
+
+    def _discard_user_key(self, key, user_id):
+        keys = self._by_user.get(user_id)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._by_user[user_id]
+
+
+token_cache = VerifiedTokenCache()
@@ -2,7 +2,8 @@ from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from .views import (
     AuthViewSet, UserViewSet, RoleViewSet,
-    BusinessElementViewSet, AccessRoleRuleViewSet, SessionViewSet
+    BusinessElementViewSet, AccessRoleRuleViewSet, SessionViewSet,
+    DiagnosticsViewSet
 )
 from .business_views import ProductViewSet, OrderViewSet, ReportViewSet
 
@@ -13,6 +14,7 @@ router.register(r'roles', RoleViewSet, basename='roles')
 router.register(r'business-elements', BusinessElementViewSet, basename='business-elements')
 router.register(r'access-rules', AccessRoleRuleViewSet, basename='access-rules')
 router.register(r'sessions', SessionViewSet, basename='sessions')
+router.register(r'diagnostics', DiagnosticsViewSet, basename='diagnostics')
 router.register(r'products', ProductViewSet, basename='products')
 router.register(r'orders', OrderViewSet, basename='orders')
 router.register(r'reports', ReportViewSet, basename='reports')
@@ -6,17 +6,34 @@ from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.exceptions import ValidationError, PermissionDenied
+from django.conf import settings
+from django.http import HttpResponse
+from django.db.models import prefetch_related_objects
+from django.utils.decorators import method_decorator
 from django.utils import timezone
 from datetime import timedelta
+import uuid
 
-from .models import User, Role, UserRole, BusinessElement, AccessRoleRule, Session
+from .models import User, Role, UserRole, BusinessElement, AccessRoleRule, Session, roles_prefetch
 from .serializers import (
     UserSerializer, UserCreateSerializer, UserUpdateSerializer, LoginSerializer,
     RoleSerializer, BusinessElementSerializer, AccessRoleRuleSerializer,
-    SessionSerializer, UserDetailSerializer
+    SessionSerializer, UserDetailSerializer, BulkRoleAssignmentSerializer,
+    PermissionChecksSerializer
 )
 from .permissions import IsAdmin, CanManageUsers, CanManageRoles
+from .pagination import UserPagination, SessionPagination, AccessRoleRulePagination
 from .authentication import generate_jwt_token, create_session, invalidate_session
+from .session_store import get_session_store
+from .role_assignments import bulk_assign_roles, bulk_remove_roles
+from .exports import stream_export, get_export_format, parse_bool_param, parse_datetime_param
+from .token_cache import token_cache
+from .instrumentation import timing_histograms
+from .metrics import (
+    registry as metrics_registry, CONTENT_TYPE as METRICS_CONTENT_TYPE,
+    login_attempts, login_duration, password_check_duration, password_checks_in_progress
+)
+from .conditional import make_etag, not_modified, rbac_condition, rbac_state
 
 
 class AuthViewSet(viewsets.ViewSet):
@@ -24,7 +41,7 @@ class AuthViewSet(viewsets.ViewSet):
     ViewSet для аутентификации (регистрация, логин, логаут).
     """
 
-    @action(detail=False, methods=['post'], permission_classes=[])
+    @action(detail=False, methods=['post'], permission_classes=[], authentication_classes=[])
     def register(self, request):
         """
         Регистрация нового пользователя.
@@ -39,7 +56,8 @@ class AuthViewSet(viewsets.ViewSet):
             }, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
-    @action(detail=False, methods=['post'], permission_classes=[])
+    @action(detail=False, methods=['post'], permission_classes=[], authentication_classes=[])
+    @login_duration.time()
     def login(self, request):
         """
         Логин пользователя.
@@ -48,30 +66,47 @@ class AuthViewSet(viewsets.ViewSet):
         """
         serializer = LoginSerializer(data=request.data)
         if not serializer.is_valid():
+            login_attempts.inc(result='invalid_request')
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
         try:
             user = User.objects.get(email=serializer.validated_data['email'])
         except User.DoesNotExist:
+            login_attempts.inc(result='invalid_credentials')
             return Response(
                 {'error': 'Неверный email или пароль'},
                 status=status.HTTP_401_UNAUTHORIZED
             )
 
         if not user.is_active:
+            login_attempts.inc(result='inactive')
             return Response(
                 {'error': 'Пользователь неактивен'},
                 status=status.HTTP_403_FORBIDDEN
             )
 
-        if not user.check_password(serializer.validated_data['password']):
+        password_checks_in_progress.inc()
+        try:
+            with password_check_duration.time():
+                password_ok = user.check_password(serializer.validated_data['password'])
+        finally:
+            password_checks_in_progress.dec()
+
+        if not password_ok:
+            login_attempts.inc(result='invalid_credentials')
             return Response(
                 {'error': 'Неверный email или пароль'},
                 status=status.HTTP_401_UNAUTHORIZED
             )
 
+        # Перехешировать пароль, если алгоритм или стоимость устарели
+        if user.password_needs_rehash():
+            user.set_password(serializer.validated_data['password'])
+            user.save(update_fields=['password_hash'])
+
         # Генерировать JWT токен
         token = generate_jwt_token(user.id)
+        login_attempts.inc(result='success')
 
         # Создать сессию
         ip_address = self._get_client_ip(request)
@@ -113,6 +148,9 @@ class AuthViewSet(viewsets.ViewSet):
         if session_id:
             invalidate_session(session_id)
 
+        # Удалить токены пользователя из кеша проверенных токенов
+        token_cache.evict_user(request.user.id)
+
         response = Response(
             {'message': 'Успешный выход'},
             status=status.HTTP_200_OK
@@ -120,11 +158,36 @@ class AuthViewSet(viewsets.ViewSet):
         response.delete_cookie('session_id')
         return response
 
+    @action(detail=False, methods=['post'], url_path='check_permissions')
+    def batch_check_permissions(self, request):
+        """
+        Проверить несколько прав текущего пользователя за один запрос.
+        POST /api/auth/check_permissions/
+        Body: {"checks": [{"element": "products", "action": "update", "owner_id": "uuid", "key": "..."}]}
+        Ключ ответа — key или "element:action[:owner_id]".
+        """
+        serializer = PermissionChecksSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        checks = serializer.validated_data['checks']
+
+        # Роли и правила загружаются один раз на весь список
+        results = request.user.check_permissions([
+            (check['element'], check['action'], check.get('owner_id'))
+            for check in checks
+        ])
+        return Response(
+            {'permissions': {check['key']: allowed for check, allowed in zip(checks, results)}},
+            status=status.HTTP_200_OK
+        )
+
     @action(detail=False, methods=['get'])
     def me(self, request):
         """
         Получить информацию о текущем пользователе.
         GET /api/auth/me/
+        GET /api/auth/me/?include=permissions — с матрицей эффективных прав
+
+        Ответ содержит ETag; при совпадении If-None-Match возвращается 304.
         """
         if not request.user:
             return Response(
@@ -132,7 +195,28 @@ class AuthViewSet(viewsets.ViewSet):
                 status=status.HTTP_401_UNAUTHORIZED
             )
 
-        return Response(UserDetailSerializer(request.user).data, status=status.HTTP_200_OK)
+        user = request.user
+        include = set(filter(None, request.query_params.get('include', '').split(',')))
+        include_permissions = 'permissions' in include
+
+        # Версия ответа: профиль, набор ролей и версия ролей/правил в БД (названия ролей входят в ответ)
+        etag = make_etag(
+            user.id, user.updated_at.isoformat(), sorted(map(str, user.role_ids)),
+            rbac_state(request)[0], 'permissions' if include_permissions else ''
+        )
+        response = not_modified(request, etag=etag)
+        if response is not None:
+            return response
+
+        prefetch_related_objects([user], roles_prefetch())
+        data = UserDetailSerializer(user).data
+        if include_permissions:
+            data['permissions'] = user.get_permission_matrix()
+
+        response = Response(data, status=status.HTTP_200_OK)
+        response['ETag'] = etag
+        response['Cache-Control'] = 'private, no-cache'
+        return response
 
     def _get_client_ip(self, request):
         """Получить IP адрес клиента."""
@@ -148,9 +232,10 @@ class UserViewSet(viewsets.ModelViewSet):
     """
     ViewSet для управления пользователями.
     """
-    queryset = User.objects.all()
+    queryset = User.objects.with_roles()
     serializer_class = UserSerializer
     permission_classes = [CanManageUsers]
+    pagination_class = UserPagination
 
     def get_serializer_class(self):
         if self.action == 'update' or self.action == 'partial_update':
@@ -175,6 +260,38 @@ class UserViewSet(viewsets.ModelViewSet):
             return Response(UserSerializer(user).data)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        """
+        Потоковая выгрузка пользователей (NDJSON или CSV).
+        GET /api/users/export/?export_format=csv&is_active=true&role=Admin
+            &created_after=2024-01-01&created_before=2024-02-01
+        Параметр role принимает ID или название роли.
+        """
+        export_format = get_export_format(request)
+        queryset = User.objects.order_by('-created_at', '-id')
+
+        is_active = parse_bool_param(request, 'is_active')
+        if is_active is not None:
+            queryset = queryset.filter(is_active=is_active)
+
+        role = request.query_params.get('role')
+        if role:
+            try:
+                queryset = queryset.filter(roles__role_id=uuid.UUID(role))
+            except ValueError:
+                queryset = queryset.filter(roles__role__name=role)
+
+        created_after = parse_datetime_param(request, 'created_after')
+        if created_after:
+            queryset = queryset.filter(created_at__gte=created_after)
+        created_before = parse_datetime_param(request, 'created_before')
+        if created_before:
+            queryset = queryset.filter(created_at__lt=created_before)
+
+        fields = ['id', 'email', 'first_name', 'last_name', 'patronymic', 'is_active', 'created_at', 'updated_at']
+        return stream_export(queryset, fields, export_format, 'users')
+
     @action(detail=True, methods=['post'], permission_classes=[CanManageUsers])
     def assign_role(self, request, pk=None):
         """
@@ -241,6 +358,28 @@ class UserViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_404_NOT_FOUND
             )
 
+    @action(detail=False, methods=['post'], permission_classes=[CanManageUsers])
+    def bulk_assign_roles(self, request):
+        """
+        Массово назначить роли пользователям.
+        POST /api/users/bulk_assign_roles/
+        Body: {"assignments": [{"user_id": "uuid", "role_id": "uuid"}, ...]}
+        """
+        serializer = BulkRoleAssignmentSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        return Response(bulk_assign_roles(serializer.get_pairs()), status=status.HTTP_200_OK)
+
+    @action(detail=False, methods=['post'], permission_classes=[CanManageUsers])
+    def bulk_remove_roles(self, request):
+        """
+        Массово снять роли с пользователей.
+        POST /api/users/bulk_remove_roles/
+        Body: {"assignments": [{"user_id": "uuid", "role_id": "uuid"}, ...]}
+        """
+        serializer = BulkRoleAssignmentSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        return Response(bulk_remove_roles(serializer.get_pairs()), status=status.HTTP_200_OK)
+
     @action(detail=True, methods=['post'], permission_classes=[CanManageUsers])
     def deactivate(self, request, pk=None):
         """
@@ -251,8 +390,9 @@ class UserViewSet(viewsets.ModelViewSet):
         user.is_active = False
         user.save()
 
-        # Инвалидировать все сессии пользователя
-        user.sessions.all().delete()
+        # Инвалидировать все сессии и кешированные токены пользователя
+        get_session_store().delete_for_user(user.id)
+        token_cache.evict_user(user.id)
 
         return Response(
             {'message': 'Пользователь деактивирован'},
@@ -275,8 +415,9 @@ class UserViewSet(viewsets.ModelViewSet):
         user.is_active = False
         user.save()
 
-        # Инвалидировать все сессии
-        user.sessions.all().delete()
+        # Инвалидировать все сессии и кешированные токены
+        get_session_store().delete_for_user(user.id)
+        token_cache.evict_user(user.id)
 
         response = Response(
             {'message': 'Ваш аккаунт удален'},
@@ -286,33 +427,44 @@ class UserViewSet(viewsets.ModelViewSet):
         return response
 
 
+@method_decorator(rbac_condition, name='list')
+@method_decorator(rbac_condition, name='retrieve')
 class RoleViewSet(viewsets.ModelViewSet):
     """
     ViewSet для управления ролями (только для Admin).
+    GET-ответы поддерживают ETag / Last-Modified и 304.
     """
     queryset = Role.objects.all()
     serializer_class = RoleSerializer
     permission_classes = [CanManageRoles]
 
 
+@method_decorator(rbac_condition, name='list')
+@method_decorator(rbac_condition, name='retrieve')
 class BusinessElementViewSet(viewsets.ModelViewSet):
     """
     ViewSet для управления бизнес-объектами (только для Admin).
+    GET-ответы поддерживают ETag / Last-Modified и 304.
     """
     queryset = BusinessElement.objects.all()
     serializer_class = BusinessElementSerializer
     permission_classes = [CanManageRoles]
 
 
+@method_decorator(rbac_condition, name='list')
+@method_decorator(rbac_condition, name='retrieve')
 class AccessRoleRuleViewSet(viewsets.ModelViewSet):
     """
     ViewSet для управления правилами доступа (только для Admin).
+    GET-ответы поддерживают ETag / Last-Modified и 304.
     """
-    queryset = AccessRoleRule.objects.all()
+    queryset = AccessRoleRule.objects.select_related('role', 'element')
     serializer_class = AccessRoleRuleSerializer
     permission_classes = [CanManageRoles]
+    pagination_class = AccessRoleRulePagination
 
     @action(detail=False, methods=['get'])
+    @method_decorator(rbac_condition)
     def by_role(self, request):
         """
         Получить все правила доступа для роли.
@@ -325,11 +477,12 @@ class AccessRoleRuleViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        rules = AccessRoleRule.objects.filter(role_id=role_id)
+        rules = self.get_queryset().filter(role_id=role_id)
         serializer = self.get_serializer(rules, many=True)
         return Response(serializer.data)
 
     @action(detail=False, methods=['get'])
+    @method_decorator(rbac_condition)
     def by_element(self, request):
         """
         Получить все правила доступа для бизнес-объекта.
@@ -342,7 +495,7 @@ class AccessRoleRuleViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        rules = AccessRoleRule.objects.filter(element_id=element_id)
+        rules = self.get_queryset().filter(element_id=element_id)
         serializer = self.get_serializer(rules, many=True)
         return Response(serializer.data)
 
@@ -351,9 +504,46 @@ class SessionViewSet(viewsets.ModelViewSet):
     """
     ViewSet для управления сессиями (только для Admin).
     """
-    queryset = Session.objects.all()
+    queryset = Session.objects.select_related('user')
     serializer_class = SessionSerializer
     permission_classes = [CanManageRoles]
+    pagination_class = SessionPagination
+
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        """
+        Потоковая выгрузка сессий (NDJSON или CSV).
+        GET /api/sessions/export/?export_format=csv&user_id=uuid&active=true
+            &created_after=2024-01-01&created_before=2024-02-01
+        """
+        export_format = get_export_format(request)
+        queryset = Session.objects.order_by('-last_activity', '-id')
+
+        user_id = request.query_params.get('user_id')
+        if user_id:
+            try:
+                queryset = queryset.filter(user_id=uuid.UUID(user_id))
+            except ValueError:
+                raise ValidationError({'user_id': 'Ожидается UUID'})
+
+        active = parse_bool_param(request, 'active')
+        if active is True:
+            queryset = queryset.filter(expires_at__gt=timezone.now())
+        elif active is False:
+            queryset = queryset.filter(expires_at__lte=timezone.now())
+
+        created_after = parse_datetime_param(request, 'created_after')
+        if created_after:
+            queryset = queryset.filter(created_at__gte=created_after)
+        created_before = parse_datetime_param(request, 'created_before')
+        if created_before:
+            queryset = queryset.filter(created_at__lt=created_before)
+
+        fields = [
+            'id', 'user_id', 'user__email', 'ip_address', 'user_agent',
+            'created_at', 'expires_at', 'last_activity'
+        ]
+        return stream_export(queryset, fields, export_format, 'sessions')
 
     @action(detail=True, methods=['post'])
     def invalidate(self, request, pk=None):
@@ -367,3 +557,42 @@ class SessionViewSet(viewsets.ModelViewSet):
             {'message': 'Сессия инвалидирована'},
             status=status.HTTP_200_OK
         )
+
+
+class DiagnosticsViewSet(viewsets.ViewSet):
+    """
+    ViewSet для служебной диагностики процесса (только для Admin).
+    """
+    permission_classes = [IsAdmin]
+
+    @action(detail=False, methods=['get'])
+    def token_cache(self, request):
+        """
+        Статистика кеша проверенных JWT токенов.
+        GET /api/diagnostics/token_cache/
+        """
+        return Response(token_cache.stats(), status=status.HTTP_200_OK)
+
+    @action(detail=False, methods=['get', 'delete'])
+    def timings(self, request):
+        """
+        Гистограммы времени обработки запросов по endpoint'ам.
+        GET /api/diagnostics/timings/
+        DELETE /api/diagnostics/timings/ — сбросить накопленные данные
+        """
+        if request.method == 'DELETE':
+            timing_histograms.clear()
+            return Response(status=status.HTTP_204_NO_CONTENT)
+
+        return Response({
+            'enabled': settings.REQUEST_INSTRUMENTATION,
+            'endpoints': timing_histograms.snapshot(),
+        }, status=status.HTTP_200_OK)
+
+    @action(detail=False, methods=['get'])
+    def metrics(self, request):
+        """
+        Метрики в формате Prometheus (text exposition format).
+        GET /api/diagnostics/metrics/
+        """
+        return HttpResponse(metrics_registry.render(), content_type=METRICS_CONTENT_TYPE)
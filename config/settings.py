@@ -25,6 +25,13 @@ MIDDLEWARE = [
     'api.middleware.AuthenticationMiddleware',
 ]
 
+# Замеры запросов: Server-Timing и гистограммы в /api/diagnostics/timings/
+REQUEST_INSTRUMENTATION = config('REQUEST_INSTRUMENTATION', default=False, cast=bool)
+# Отдавать ли замеры клиенту в заголовке Server-Timing
+REQUEST_INSTRUMENTATION_HEADER = config('REQUEST_INSTRUMENTATION_HEADER', default=True, cast=bool)
+if REQUEST_INSTRUMENTATION:
+    MIDDLEWARE.insert(MIDDLEWARE.index('api.middleware.AuthenticationMiddleware'), 'api.middleware.InstrumentationMiddleware')
+
 ROOT_URLCONF = 'config.urls'
 
 TEMPLATES = [
@@ -46,7 +53,7 @@ WSGI_APPLICATION = 'config.wsgi.application'
 # Database
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.postgresql',
+        'ENGINE': config('DB_ENGINE', default='django.db.backends.postgresql'),
         'NAME': config('DB_NAME', default='auth_system'),
         'USER': config('DB_USER', default='postgres'),
         'PASSWORD': config('DB_PASSWORD', default='postgres'),
@@ -55,6 +62,16 @@ DATABASES = {
     }
 }
 
+# Cache
+# Используется для версии матрицы прав доступа (api.access_matrix).
+# При нескольких воркерах укажите общий бэкенд (Redis, Memcached).
+CACHES = {
+    'default': {
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('CACHE_LOCATION', default=''),
+    }
+}
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -76,7 +93,7 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # REST Framework Configuration
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'api.authentication.JWTAuthentication',
+        'api.authentication.MiddlewareAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'api.permissions.IsAuthenticated',
@@ -85,10 +102,61 @@ REST_FRAMEWORK = {
     'PAGE_SIZE': 10,
 }
 
+# Максимальное количество проверок в /api/auth/check_permissions/
+PERMISSION_CHECKS_MAX_ITEMS = config('PERMISSION_CHECKS_MAX_ITEMS', default=500, cast=int)
+
+# Максимальное количество пар в /api/users/bulk_assign_roles/ и bulk_remove_roles/
+BULK_ROLE_ASSIGNMENT_MAX_ITEMS = config('BULK_ROLE_ASSIGNMENT_MAX_ITEMS', default=10000, cast=int)
+
+# Максимальное количество элементов в bulk_create/bulk_update/bulk_delete товаров и заказов
+BUSINESS_BULK_MAX_ITEMS = config('BUSINESS_BULK_MAX_ITEMS', default=50000, cast=int)
+
+# Общий каталог для метрик нескольких процессов (пусто — метрики только текущего процесса)
+METRICS_MULTIPROCESS_DIR = config('METRICS_MULTIPROCESS_DIR', default='')
+# Как часто процесс сохраняет свои метрики в METRICS_MULTIPROCESS_DIR (секунды)
+METRICS_FLUSH_INTERVAL = config('METRICS_FLUSH_INTERVAL', default=5, cast=float)
+
+# Размер пачки строк при потоковой выгрузке (/api/users/export/, /api/sessions/export/)
+EXPORT_CHUNK_SIZE = config('EXPORT_CHUNK_SIZE', default=2000, cast=int)
+
 # JWT Configuration
 JWT_SECRET = config('JWT_SECRET', default='your-jwt-secret-key-change-in-production')
 JWT_ALGORITHM = 'HS256'
 JWT_EXPIRATION_HOURS = 24
+# Включать ID ролей и их версию в claims токена (нужен общий CACHES при нескольких воркерах)
+JWT_EMBED_ROLES = config('JWT_EMBED_ROLES', default=False, cast=bool)
+# Размер кеша проверенных токенов в процессе (0 — кеш выключен)
+JWT_TOKEN_CACHE_SIZE = config('JWT_TOKEN_CACHE_SIZE', default=0, cast=int)
+
+# Password Hashing Configuration
+# Алгоритм для новых хешей (bcrypt, scrypt); устаревшие хеши обновляются при входе
+PASSWORD_HASHER = config('PASSWORD_HASHER', default='bcrypt')
+BCRYPT_ROUNDS = config('BCRYPT_ROUNDS', default=12, cast=int)
+SCRYPT_COST = config('SCRYPT_COST', default=14, cast=int)
+# bcrypt выполняется в ограниченном пуле потоков; при переполнении — 503
+PASSWORD_HASHING_WORKERS = config('PASSWORD_HASHING_WORKERS', default=4, cast=int)
+PASSWORD_HASHING_QUEUE_SIZE = config('PASSWORD_HASHING_QUEUE_SIZE', default=16, cast=int)
+PASSWORD_HASHING_TIMEOUT = config('PASSWORD_HASHING_TIMEOUT', default=10, cast=float)
+
+# Access Matrix Configuration
+# Максимальное время жизни скомпилированной матрицы прав в процессе (секунды)
+ACCESS_MATRIX_TTL = config('ACCESS_MATRIX_TTL', default=60, cast=int)
+
+# Session Store Configuration
+# api.session_store.DatabaseSessionStore | InMemorySessionStore | FileSessionStore
+SESSION_STORE_BACKEND = config('SESSION_STORE_BACKEND', default='api.session_store.DatabaseSessionStore')
+SESSION_STORE_OPTIONS = {}
+# Отложенная запись last_activity: интервал и размер буфера, минимальный возраст (секунды)
+SESSION_ACTIVITY_FLUSH_INTERVAL = config('SESSION_ACTIVITY_FLUSH_INTERVAL', default=30, cast=int)
+SESSION_ACTIVITY_FLUSH_SIZE = config('SESSION_ACTIVITY_FLUSH_SIZE', default=500, cast=int)
+SESSION_ACTIVITY_MIN_AGE = config('SESSION_ACTIVITY_MIN_AGE', default=60, cast=int)
+# Удаление истекших сессий: период фонового потока (0 — только командой reap_sessions),
+# размер пачки и пауза между пачками
+SESSION_REAPER_INTERVAL = config('SESSION_REAPER_INTERVAL', default=0, cast=int)
+SESSION_REAPER_BATCH_SIZE = config('SESSION_REAPER_BATCH_SIZE', default=1000, cast=int)
+SESSION_REAPER_SLEEP = config('SESSION_REAPER_SLEEP', default=0.1, cast=float)
+# Каталог FileSessionStore (по умолчанию — во временном каталоге системы)
+SESSION_STORE_PATH = config('SESSION_STORE_PATH', default='')
 
 # CORS Configuration
 CORS_ALLOWED_ORIGINS = config(
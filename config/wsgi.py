@@ -5,3 +5,9 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
 
 application = get_wsgi_application()
+
+# Фоновое удаление истекших сессий — только в обслуживающем процессе,
+# а не в manage.py migrate/test/shell и не в родителе автоперезагрузки runserver
+from api.session_reaper import start_session_reaper  # noqa: E402
+
+start_session_reaper()